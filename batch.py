@@ -0,0 +1,465 @@
+from router import *
+
+# numpy is optional, only this backend needs it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# upper bound on the number of floats in one relaxation chunk (routers x degree x routers)
+BATCH_RELAX_CHUNK_SIZE = 1 << 22
+BATCH_MIN_QUEUE_CAPACITY = 64 # packet slots the queue arrays start with
+BATCH_FAILURE_THROTTLE = 0.5 # throttle a full router asks its sender for, as in Router.sendRoutingFailure
+BATCH_TRIGGERED_BROADCAST = 1000 # timeSinceBroadcast a routing update sets, as in Router.processPacketMeta
+
+# Whole-network router state kept as struct of arrays so that routing, throttle
+# decay and link progress can be computed for every router at once instead of
+# one Python loop per router.
+#
+# a BatchNetwork runs a simulation on its own with tick/run: broadcast timers, distance
+# vector routing, throttle decay, queues, links and the handoff of packets between
+# routers all live in the arrays, and BatchRouterView reads a router back out of them.
+# every router does each phase of Router.timeTick at the same time instead of one
+# router after another, so a packet handed on is picked up on the next tick, and
+# broadcasts always carry the whole routing table (no delta broadcasts or link state).
+# pullFromRouters starts it from the state of Router objects, pushToRouters copies the
+# routing tables, links, timers and counters back (queued packets stay in the arrays).
+#
+# cost[i][d] / nextHop[i][d]  --> routing table of router i (nextHop is -1 for no route)
+# link arrays                 --> one entry per directed connection, linkSrc -> linkDst
+# neighbor/neighborLink       --> per router connection list, padded with -1 to the max degree
+# queueCount/queueBytes       --> per router queue counters
+# queued arrays               --> every queued packet: router it's queued at (-1 for a free
+#                                 slot), destination and size. slots are in arrival order,
+#                                 so a router's first slot is the head of its queue
+# packetDest/Size/Prog        --> per router packet currently on a link (packetDest is -1 for none)
+# timeSinceBroadcast and per router counters as in Router
+class BatchNetwork:
+    def __init__(self, numRouters, links, config = None):
+        if(np == None):
+            raise ImportError("the batch backend requires numpy")
+        if(config == None):
+            config = DEFAULT_SIMULATION_CONFIG
+        if(config.routingMode != ROUTING_DISTANCE_VECTOR):
+            raise ValueError("the batch backend only runs distance vector routing")
+
+        self.numRouters = numRouters
+        self.config = config
+        self.cost = np.full((numRouters, numRouters), float(ROUTER_NO_ROUTE_COST))
+        np.fill_diagonal(self.cost, 0)
+        self.nextHop = np.full((numRouters, numRouters), -1, dtype=np.int32)
+
+        # links given as (src, dst, throughput)
+        numLinks = len(links)
+        self.linkSrc = np.zeros(numLinks, dtype=np.int32)
+        self.linkDst = np.zeros(numLinks, dtype=np.int32)
+        self.linkThroughput = np.zeros(numLinks)
+        for i in range(numLinks):
+            self.linkSrc[i], self.linkDst[i], self.linkThroughput[i] = links[i]
+        self.linkThroughputPercent = np.ones(numLinks)
+        self.linkThrottlePercent = np.ones(numLinks)
+        self.linkCost = 100 * 1 / self.linkThroughput
+
+        degree = np.bincount(self.linkSrc, minlength=numRouters)
+        self.degree = degree
+        maxDegree = max(1, int(degree.max()) if numLinks != 0 else 1)
+        self.neighbor = np.full((numRouters, maxDegree), -1, dtype=np.int32)
+        self.neighborLink = np.full((numRouters, maxDegree), -1, dtype=np.int32)
+        slots = np.zeros(numRouters, dtype=np.int32)
+        for i in range(numLinks):
+            src = self.linkSrc[i]
+            self.neighbor[src, slots[src]] = self.linkDst[i]
+            self.neighborLink[src, slots[src]] = i
+            slots[src] += 1
+
+        self.queueCount = np.zeros(numRouters, dtype=np.int32)
+        self.queueBytes = np.zeros(numRouters)
+        self.maxQueueSize = np.full(numRouters, config.maxQueueSize, dtype=np.int32)
+        self.queuedRouter = np.full(BATCH_MIN_QUEUE_CAPACITY, -1, dtype=np.int32)
+        self.queuedDest = np.zeros(BATCH_MIN_QUEUE_CAPACITY, dtype=np.int32)
+        self.queuedSize = np.zeros(BATCH_MIN_QUEUE_CAPACITY)
+        self.queuedLength = 0 # slots in use, free ones included
+        self.packetDest = np.full(numRouters, -1, dtype=np.int32)
+        self.packetSize = np.zeros(numRouters)
+        self.packetProg = np.zeros(numRouters)
+
+        self.timeSinceBroadcast = np.zeros(numRouters, dtype=np.int64)
+        self.broadcastSize = Packet_META_Crafter.ROUTING_INFO_SIZE + numRouters * Packet_META_Crafter.ROUTING_ENTRY_SIZE
+        self.packetsForwarded = np.zeros(numRouters, dtype=np.int64)
+        self.packetsDropped = np.zeros(numRouters, dtype=np.int64)
+        self.packetsDelivered = np.zeros(numRouters, dtype=np.int64)
+        self.controlPacketsSent = np.zeros(numRouters, dtype=np.int64)
+        self.controlBytesSent = np.zeros(numRouters, dtype=np.int64)
+        self.lastChange = 0 # time after the tick of the last routing table change
+
+        # direct connections are routes, same as Router.createConnection
+        for i in range(numLinks):
+            src = self.linkSrc[i]
+            dst = self.linkDst[i]
+            if(self.linkCost[i] < self.cost[src, dst]):
+                self.cost[src, dst] = self.linkCost[i]
+                self.nextHop[src, dst] = dst
+
+    # one distance vector round for every router: each router hears the routing table
+    # (as it was at the start of the round) of every neighbor in senders, a bool per
+    # router, or of every neighbor if None, at once. like meta_type 1 in
+    # Router.processPacketMeta, a route is replaced if an offer is cheaper, and a route
+    # always follows the cost its current next hop advertises. routers that took an
+    # offer are set in triggered, a bool per router, if given. returns the number of
+    # routing entries that changed
+    def relaxRouting(self, senders = None, triggered = None):
+        numRouters = self.numRouters
+        maxDegree = self.neighbor.shape[1]
+        if(senders is None): # numpy arrays compare elementwise
+            senders = np.ones(numRouters, dtype=bool)
+        oldCost = self.cost.copy()
+        newCost = self.cost.copy()
+        newNextHop = self.nextHop.copy()
+        padded = self.neighbor < 0
+        neighbor = np.where(padded, 0, self.neighbor)
+        neighborCost = np.where(padded | ~senders[neighbor], np.inf, self.linkCost[self.neighborLink])
+
+        chunk = max(1, BATCH_RELAX_CHUNK_SIZE // max(1, maxDegree * numRouters))
+        for start in range(0, numRouters, chunk):
+            end = min(numRouters, start + chunk)
+            rows = np.arange(start, end)
+            # offers[i, k, d]: cost to d through router i's k-th neighbor
+            offers = neighborCost[start:end, :, None] + oldCost[neighbor[start:end]]
+            offers[np.arange(end - start), :, rows] = np.inf # skip own entry in their table
+
+            bestSlot = np.argmin(offers, axis=1)
+            bestCost = np.take_along_axis(offers, bestSlot[:, None, :], axis=1)[:, 0, :]
+            bestHop = np.take_along_axis(self.neighbor[start:end], bestSlot, axis=1)
+
+            currentHop = self.nextHop[start:end]
+            hasRoute = currentHop >= 0
+            currentSent = hasRoute & senders[np.where(hasRoute, currentHop, 0)]
+            currentSlot = np.argmax(self.neighbor[start:end, :, None] == currentHop[:, None, :], axis=1)
+            currentOffer = np.take_along_axis(offers, currentSlot[:, None, :], axis=1)[:, 0, :]
+            currentOffer = np.where(hasRoute, currentOffer, np.inf)
+
+            # prefer the route we're using on ties so next hops don't flap
+            keepHop = hasRoute & (currentOffer <= bestCost)
+            offerCost = np.where(keepHop, currentOffer, bestCost)
+            offerHop = np.where(keepHop, currentHop, bestHop)
+            update = (offerCost < oldCost[start:end]) | (currentSent & np.isfinite(offerCost))
+            newCost[start:end] = np.where(update, offerCost, oldCost[start:end])
+            newNextHop[start:end] = np.where(update, offerHop, currentHop)
+            if(triggered is not None):
+                triggered[start:end] |= update.any(axis=1)
+
+        changed = int(np.count_nonzero((newCost != self.cost) | (newNextHop != self.nextHop)))
+        self.cost = newCost
+        self.nextHop = newNextHop
+        return changed
+
+    # Router.checkConnectionThrottles for every link. throttled links decay towards full
+    # throughput, and links that are close enough snap back and update the costs of
+    # routes using them
+    def decayThrottles(self):
+        throttled = self.linkThrottlePercent != 1
+        snap = throttled & (self.linkThrottlePercent >= 0.95)
+        decay = throttled & ~snap
+        self.linkThrottlePercent[decay] += (1 - self.linkThrottlePercent[decay]) * self.config.throughputDecay
+
+        snapped = np.nonzero(snap)[0]
+        if(len(snapped) != 0):
+            self.setLinkThrottles(snapped, 1)
+
+    # Router.updateConnectionThrottle for the given links: sets their throttle and moves
+    # the cost of the routes using them by the change in link cost
+    def setLinkThrottles(self, links, throttlePercent):
+        self.linkThrottlePercent[links] = throttlePercent
+        oldCost = self.linkCost[links]
+        self.linkCost[links] = 100 * 1 / (self.linkThroughput[links] * self.linkThroughputPercent[links] * self.linkThrottlePercent[links])
+        difference = self.linkCost[links] - oldCost
+        for i in range(len(links)):
+            src = self.linkSrc[links[i]]
+            usesLink = self.nextHop[src] == self.linkDst[links[i]]
+            self.cost[src, usesLink] += difference[i]
+
+    # adds one tick of progress to every packet on a link, only for routers in moving if
+    # given. returns the ids of routers whose packet finished and should be handed to
+    # the next router. a packet whose destination has no route isn't on any link and
+    # makes no progress
+    def advanceLinks(self, moving = None):
+        sending = self.packetDest >= 0
+        if(moving is not None):
+            sending &= moving
+        sending = np.nonzero(sending)[0]
+        if(len(sending) == 0):
+            return sending
+
+        hop = self.nextHop[sending, self.packetDest[sending]]
+        routed = hop >= 0
+        sending = sending[routed]
+        hop = hop[routed]
+        if(len(sending) == 0):
+            return sending
+        slot = np.argmax(self.neighbor[sending] == hop[:, None], axis=1)
+        link = self.neighborLink[sending, slot]
+        self.packetProg[sending] += self.linkThroughput[link] * self.linkThroughputPercent[link] * self.linkThrottlePercent[link]
+        return sending[self.packetProg[sending] > self.packetSize[sending]]
+
+    # one tick of every router, in Router.timeTick's phase order
+    def tick(self, time):
+        config = self.config
+        # broadcast
+        if(time <= config.initializationTime):
+            frequency = config.initialBroadcastFrequency
+        else:
+            frequency = math.ceil(config.broadcastFrequency)
+        broadcasting = self.timeSinceBroadcast >= frequency
+        self.timeSinceBroadcast += 1
+        if(broadcasting.any()):
+            self.timeSinceBroadcast[broadcasting] = 0
+            self.controlPacketsSent[broadcasting] += self.degree[broadcasting]
+            self.controlBytesSent[broadcasting] += self.degree[broadcasting] * self.broadcastSize
+            # routers that took an update pass it on with their next broadcast
+            triggered = np.zeros(self.numRouters, dtype=bool)
+            if(self.relaxRouting(broadcasting, triggered) != 0):
+                self.lastChange = time + 1
+            self.timeSinceBroadcast[triggered] = BATCH_TRIGGERED_BROADCAST
+
+        if(time % config.throughputDecayFrequency == 0):
+            self.decayThrottles()
+
+        # dequeue, then link. like Router.tickLink, a packet just taken off the queue only
+        # moves this tick if there are more queued behind it
+        started = self.dequeuePackets()
+        finished = self.advanceLinks(~started | (self.queueCount > 0))
+        for routerID in finished:
+            self.handOff(int(routerID))
+
+    # runs timeToRun ticks starting at time, returns the end time
+    def run(self, timeToRun, time):
+        for i in range(timeToRun):
+            self.tick(time)
+            time = time + 1
+        return time
+
+    # ConvergenceDetector.runUntilConverged for the batch network: runs until no routing
+    # table entry has changed for quietTicks ticks, or until maxTicks have run. returns
+    # the time it stopped at
+    def runUntilConverged(self, maxTicks, quietTicks, time):
+        startTime = time
+        self.lastChange = time
+        while(time - self.lastChange < quietTicks and time - startTime < maxTicks):
+            self.tick(time)
+            time = time + 1
+        return time
+
+    # queues a data packet at its source router, like source.queuePacket(packet, source).
+    # returns false if it was dropped
+    def inject(self, sourceID, destinationID, size):
+        if(sourceID == destinationID):
+            self.packetsDelivered[destinationID] += 1
+            return True
+        if(not self.enqueue(sourceID, destinationID, size)):
+            self.packetsDropped[sourceID] += 1
+            return False
+        return True
+
+    # queues a packet at routerID if its queue has room, returns false if it doesn't
+    def enqueue(self, routerID, destinationID, size):
+        if(self.queueBytes[routerID] + size >= self.maxQueueSize[routerID]):
+            return False
+        self.appendQueued(routerID, destinationID, size)
+        return True
+
+    def appendQueued(self, routerID, destinationID, size):
+        if(self.queuedLength == len(self.queuedRouter)):
+            self.compactQueues()
+        slot = self.queuedLength
+        self.queuedRouter[slot] = routerID
+        self.queuedDest[slot] = destinationID
+        self.queuedSize[slot] = size
+        self.queuedLength += 1
+        self.queueCount[routerID] += 1
+        self.queueBytes[routerID] += size
+
+    # moves the queued packets to the front of the queued arrays, keeping their order,
+    # and doubles the arrays if that doesn't free up half of them
+    def compactQueues(self):
+        used = np.nonzero(self.queuedRouter[:self.queuedLength] >= 0)[0]
+        capacity = len(self.queuedRouter)
+        if(2 * len(used) > capacity):
+            capacity *= 2
+        queuedRouter = np.full(capacity, -1, dtype=np.int32)
+        queuedDest = np.zeros(capacity, dtype=np.int32)
+        queuedSize = np.zeros(capacity)
+        queuedRouter[:len(used)] = self.queuedRouter[used]
+        queuedDest[:len(used)] = self.queuedDest[used]
+        queuedSize[:len(used)] = self.queuedSize[used]
+        self.queuedRouter = queuedRouter
+        self.queuedDest = queuedDest
+        self.queuedSize = queuedSize
+        self.queuedLength = len(used)
+
+    # every router without a packet on its link takes the head of its queue, dropping it
+    # if there's no route for it. returns a bool per router, true if it took a packet
+    def dequeuePackets(self):
+        started = np.zeros(self.numRouters, dtype=bool)
+        idle = (self.packetDest < 0) & (self.queueCount > 0)
+        if(not idle.any()):
+            return started
+
+        length = self.queuedLength
+        queuedRouter = self.queuedRouter[:length]
+        slots = np.nonzero(queuedRouter >= 0)[0]
+        slots = slots[idle[queuedRouter[slots]]]
+        head = np.full(self.numRouters, length, dtype=np.int64)
+        np.minimum.at(head, queuedRouter[slots], slots)
+        routers = np.nonzero(head < length)[0]
+        slots = head[routers]
+        dest = self.queuedDest[slots]
+        size = self.queuedSize[slots]
+        self.queuedRouter[slots] = -1
+        self.queueCount[routers] -= 1
+        self.queueBytes[routers] -= size
+        started[routers] = True
+
+        routed = self.nextHop[routers, dest] >= 0
+        self.packetsDropped[routers[~routed]] += 1
+        routers = routers[routed]
+        self.packetDest[routers] = dest[routed]
+        self.packetSize[routers] = size[routed]
+        self.packetProg[routers] = 0
+        return started
+
+    # sends the packet that finished on routerID's link to the next router: delivered if
+    # that's its destination, queued there otherwise, or dropped with the link throttled
+    # like Router.queuePacket does when the next router's queue is full
+    def handOff(self, routerID):
+        dest = int(self.packetDest[routerID])
+        size = float(self.packetSize[routerID])
+        hop = int(self.nextHop[routerID, dest])
+        self.packetDest[routerID] = -1
+        self.packetsForwarded[routerID] += 1
+        if(hop == dest):
+            self.packetsDelivered[hop] += 1
+        elif(not self.enqueue(hop, dest, size)):
+            self.packetsDropped[hop] += 1
+            link = self.getLinkIndex(routerID, hop)
+            self.setLinkThrottles(np.array([link]), self.linkThrottlePercent[link] * BATCH_FAILURE_THROTTLE)
+
+    # returns the link index for the connection from src to dst, or -1
+    def getLinkIndex(self, src, dst):
+        slots = np.nonzero(self.neighbor[src] == dst)[0]
+        if(len(slots) == 0):
+            return -1
+        return int(self.neighborLink[src, slots[0]])
+
+    # copies the state of Router objects into the arrays
+    def pullFromRouters(self, routers):
+        self.queuedRouter[:] = -1
+        self.queuedLength = 0
+        self.queueCount[:] = 0
+        self.queueBytes[:] = 0
+        for i in range(len(routers)):
+            router = routers[i]
+            self.cost[i] = np.frombuffer(router.routeCost, dtype=np.float64)
+            self.nextHop[i] = np.frombuffer(router.routeNextHop, dtype=np.int32)
+            for j in range(len(router.connections)):
+                connection = router.connections[j]
+                link = self.getLinkIndex(i, connection.other.routerID)
+                self.linkThroughputPercent[link] = connection.throughputPercent
+                self.linkThrottlePercent[link] = connection.throttlePercent
+                self.linkCost[link] = connection.cost
+            self.maxQueueSize[i] = router.maxQueueSize
+            for packet in router.queuedPackets:
+                self.appendQueued(i, packet.getDestinationID(), packet.size)
+            self.timeSinceBroadcast[i] = router.timeSinceBroadcast
+            self.packetsForwarded[i] = router.packetsForwarded
+            self.packetsDropped[i] = router.packetsDropped
+            self.controlPacketsSent[i] = router.controlPacketsSent
+            self.controlBytesSent[i] = router.controlBytesSent
+            if(router.currentPacket != None):
+                self.packetDest[i] = router.currentPacket.getDestinationID()
+                self.packetSize[i] = router.currentPacket.size
+                self.packetProg[i] = router.currentPacketProg
+            else:
+                self.packetDest[i] = -1
+
+    # copies routing tables, connection state, link progress, timers and counters back
+    # into Router objects
+    def pushToRouters(self, routers):
+        for i in range(len(routers)):
+            router = routers[i]
+            np.frombuffer(router.routeCost, dtype=np.float64)[:] = self.cost[i]
+            np.frombuffer(router.routeNextHop, dtype=np.int32)[:] = self.nextHop[i]
+            router.rebuildRoutingIndex()
+            for j in range(len(router.connections)):
+                connection = router.connections[j]
+                link = self.getLinkIndex(i, connection.other.routerID)
+                connection.throughputPercent = float(self.linkThroughputPercent[link])
+                connection.throttlePercent = float(self.linkThrottlePercent[link])
+                connection.cost = float(self.linkCost[link])
+            if(router.currentPacket != None):
+                router.currentPacketProg = float(self.packetProg[i])
+            router.timeSinceBroadcast = int(self.timeSinceBroadcast[i])
+            router.packetsForwarded = int(self.packetsForwarded[i])
+            router.packetsDropped = int(self.packetsDropped[i])
+            router.controlPacketsSent = int(self.controlPacketsSent[i])
+            router.controlBytesSent = int(self.controlBytesSent[i])
+
+    # returns a read only Router-like view of one router's state
+    def getRouter(self, routerID):
+        return BatchRouterView(self, routerID)
+
+# builds a batch network from already connected Router objects
+def buildBatchNetwork(routers):
+    links = []
+    for i in range(len(routers)):
+        for connection in routers[i].connections:
+            links.append((i, connection.other.routerID, connection.throughput))
+    network = BatchNetwork(len(routers), links, routers[0].config if len(routers) != 0 else None)
+    network.pullFromRouters(routers)
+    return network
+
+# thin view over one router's row of a BatchNetwork, answering the same routing
+# questions as Router
+class BatchRouterView:
+    def __init__(self, network, routerID):
+        self.network = network
+        self.routerID = routerID
+        self.numRouters = network.numRouters
+
+    # [destID, cost, nextRouterID] rows, built on request
+    @property
+    def routingTable(self):
+        cost = self.network.cost[self.routerID]
+        nextHop = self.network.nextHop[self.routerID]
+        return [[i, float(cost[i]), None if nextHop[i] < 0 else int(nextHop[i])] for i in range(self.numRouters)]
+
+    @property
+    def queueSize(self):
+        return float(self.network.queueBytes[self.routerID])
+
+    @property
+    def queueCount(self):
+        return int(self.network.queueCount[self.routerID])
+
+    @property
+    def packetsForwarded(self):
+        return int(self.network.packetsForwarded[self.routerID])
+
+    @property
+    def packetsDropped(self):
+        return int(self.network.packetsDropped[self.routerID])
+
+    @property
+    def maxQueueSize(self):
+        return int(self.network.maxQueueSize[self.routerID])
+
+    # returns -1 if can't find a next router, otherwise the router ID for the next router
+    def getNextRouterID(self, packet):
+        return int(self.network.nextHop[self.routerID, packet.getDestinationID()])
+
+    # returns true if routing table has a route to ID
+    def doesRouteExist(self, id):
+        return self.network.nextHop[self.routerID, id] >= 0
+
+    # returns the value of the routing table's distance to ID
+    def getDistanceToRouterID(self, id):
+        return float(self.network.cost[self.routerID, id])
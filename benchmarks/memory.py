@@ -0,0 +1,52 @@
+import sys
+import tracemalloc
+from router import *
+
+# Memory benchmark for the router data structures. Builds ring topologies of
+# increasing size and reports the bytes allocated per router (routing table,
+# connections, queues) and per in-flight packet.
+#
+# run from the repository root: python -m benchmarks.memory [numRouters ...]
+
+MEMORY_BENCHMARK_SIZES = [16, 256, 1024, 4096]
+MEMORY_BENCHMARK_PACKETS = 10000
+
+# returns the bytes allocated while building numRouters routers connected in a ring
+def measureRouters(numRouters):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    routers = []
+    for i in range(numRouters):
+        routers.append(Router(i, numRouters))
+    for i in range(numRouters):
+        other = routers[(i + 1) % numRouters]
+        routers[i].createConnection(other, 1, 0)
+        other.createConnection(routers[i], 1, 0)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, routers
+
+# returns the bytes allocated by numPackets data packets and trace packets queued on a router
+def measurePackets(routers, numPackets):
+    source = routers[0]
+    destination = routers[len(routers) // 2]
+    results = []
+    for crafter in (lambda: Packet(source, destination, 10, None, None, False),
+                    lambda: Packet_META_Crafter.RoutingInfoTracePacket(source, destination)):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        packets = []
+        for i in range(numPackets):
+            packets.append(crafter())
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        results.append(used / numPackets)
+    return results
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or MEMORY_BENCHMARK_SIZES
+    print("routers, bytes/router, bytes/data packet, bytes/trace packet")
+    for numRouters in sizes:
+        used, routers = measureRouters(numRouters)
+        dataBytes, traceBytes = measurePackets(routers, MEMORY_BENCHMARK_PACKETS)
+        print(str(numRouters) + ", " + str(round(used / numRouters)) + ", " + str(round(dataBytes)) + ", " + str(round(traceBytes)))
@@ -0,0 +1,109 @@
+import argparse
+import json
+import random
+import time as clock
+from main import *
+from topology import TOPOLOGY_GENERATORS
+from paths import PathQuery
+
+# Routing mode benchmark. Runs distance vector and link state routing on the same
+# generated topologies and compares how fast and how cheaply they converge, first from a
+# cold start and then after a router fails and after it comes back. appends one JSON
+# line per run to the output file:
+#
+#   topology, routers, connections, mode, scheduler, seed, then per stage (cold, failure,
+#   repair): <stage>_ticks, <stage>_seconds, <stage>_control_packets, <stage>_control_bytes
+#
+# plus mean_route_cost, the average cost of every existing route once repaired, which
+# is the same in both modes when distance vector found the shortest paths, and
+# optimal_routes, the fraction of reachable pairs routed along a shortest path then.
+# ticks count from the start of the stage to the last routing table change
+#
+# run from the repository root: python -m benchmarks.routing_modes --sizes 16,64,256
+
+ROUTING_MODES_DEFAULT_SIZES = "16,64,256"
+ROUTING_MODES_DEFAULT_TOPOLOGIES = ",".join(TOPOLOGY_GENERATORS)
+ROUTING_MODES_QUIET_TICKS = 2 * ROUTER_BROADCAST_FREQUENCY + 1 # ticks without a routing change
+ROUTING_MODES_MAX_TICKS = 5000
+ROUTING_MODES = {"distance_vector": ROUTING_DISTANCE_VECTOR, "link_state": ROUTING_LINK_STATE}
+
+# builds the routers for a generated topology
+def buildRouters(numRouters, edges, config):
+    routers = [Router(i, numRouters, config) for i in range(numRouters)]
+    for idA, idB, bandwidth in edges:
+        createMutualConnection(routers[idA], routers[idB], bandwidth)
+    return routers
+
+# runs until routing converges and adds the stage's columns to result. returns the end time
+def runStage(stage, routers, detector, time, result):
+    packetsBefore = sum(router.controlPacketsSent for router in routers)
+    bytesBefore = sum(router.controlBytesSent for router in routers)
+    start = clock.perf_counter()
+    startTime = time
+    time = detector.runUntilConverged(ROUTING_MODES_MAX_TICKS, ROUTING_MODES_QUIET_TICKS, time)
+    result[stage + "_ticks"] = detector.lastChange - startTime if detector.converged else -1
+    result[stage + "_seconds"] = clock.perf_counter() - start
+    result[stage + "_control_packets"] = sum(router.controlPacketsSent for router in routers) - packetsBefore
+    result[stage + "_control_bytes"] = sum(router.controlBytesSent for router in routers) - bytesBefore
+    return time
+
+# runs one benchmark case, returns its result row
+def runCase(name, size, mode, useScheduler, seed):
+    rng = random.Random(seed)
+    numRouters, edges = TOPOLOGY_GENERATORS[name](size, rng)
+    routers = buildRouters(numRouters, edges, SimulationConfig(routingMode=ROUTING_MODES[mode]))
+    scheduler = EventScheduler(routers) if useScheduler else None
+    detector = ConvergenceDetector(routers, scheduler)
+
+    result = {
+        "topology": name,
+        "routers": numRouters,
+        "connections": len(edges),
+        "mode": mode,
+        "scheduler": useScheduler,
+        "seed": seed,
+    }
+    time = runStage("cold", routers, detector, 0, result)
+    # the busiest router fails, the same one in both modes
+    failed = max(routers, key=lambda router: (len(router.connections), -router.routerID))
+    failed.forceRouterFailure()
+    time = runStage("failure", routers, detector, time, result)
+    failed.forceFullThroughput()
+    time = runStage("repair", routers, detector, time, result)
+
+    total = 0
+    routes = 0
+    for router in routers:
+        for cost in router.routeCost:
+            if(cost < ROUTER_NO_ROUTE_COST):
+                total += cost
+                routes += 1
+    result["mean_route_cost"] = total / routes
+    summary = PathQuery(routers).comparePaths()
+    result["optimal_routes"] = summary["optimal"] / max(1, summary["pairs"] - summary["unreachable"])
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="distance vector vs link state routing benchmark")
+    parser.add_argument("--topologies", default=ROUTING_MODES_DEFAULT_TOPOLOGIES)
+    parser.add_argument("--sizes", default=ROUTING_MODES_DEFAULT_SIZES)
+    parser.add_argument("--scheduler", action="store_true", help="use the event scheduler")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="routing_modes_output.jsonl")
+    args = parser.parse_args()
+
+    with open(args.output, "a") as output:
+        for name in args.topologies.split(","):
+            for size in args.sizes.split(","):
+                for mode in ROUTING_MODES:
+                    result = runCase(name, int(size), mode, args.scheduler, args.seed)
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
+                    line = result["topology"] + " " + str(result["routers"]) + " " + mode + ":"
+                    for stage in ("cold", "failure", "repair"):
+                        line += " " + stage + " " + str(result[stage + "_ticks"]) + " ticks " \
+                                + str(result[stage + "_control_packets"]) + " packets " \
+                                + str(result[stage + "_control_bytes"]) + " bytes " \
+                                + str(round(result[stage + "_seconds"], 2)) + "s,"
+                    print(line + " mean cost " + str(round(result["mean_route_cost"], 1))
+                          + ", " + str(round(100 * result["optimal_routes"], 1)) + "% optimal")
@@ -0,0 +1,185 @@
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import time as clock
+from main import *
+from topology import TOPOLOGY_GENERATORS
+
+# Scaling benchmark. Generates each topology at each size, runs it until routing
+# converges, then pushes random data traffic through it, and appends one JSON line
+# per run to the output file so runs can be compared:
+#
+#   topology, routers, connections, backend, scheduler, seed, setup_seconds,
+#   convergence_ticks, convergence_seconds, ticks_per_second,
+#   packets_forwarded_per_second, control_bytes, peak_rss_kb
+#
+# backend is "router" for Router objects, or "batch" with --batch for the numpy
+# BatchNetwork (batch.py), which runs the same scenario on its arrays.
+# with --profile every run is timed per timeTick phase (profiler.PhaseProfiler) and the
+# row also gets phase_seconds, the exclusive seconds spent in each phase.
+# every run happens in its own process so peak_rss_kb is that run's peak.
+# routing tables are numRouters x numRouters, which bounds the sizes that fit in memory
+#
+# run from the repository root: python -m benchmarks.scaling --sizes 16,256,1024
+
+SCALING_DEFAULT_SIZES = "16,64,256,1024"
+SCALING_DEFAULT_TOPOLOGIES = ",".join(TOPOLOGY_GENERATORS)
+SCALING_CONVERGENCE_QUIET_TICKS = 2 * ROUTER_BROADCAST_FREQUENCY + 1 # ticks without a routing change
+SCALING_MAX_CONVERGENCE_TICKS = 5000
+SCALING_PACKET_SIZE = 10
+SCALING_MAX_QUEUE_SIZE = 100 # same as most routers in router_info.ri
+
+# builds the routers for a generated topology
+def buildRouters(numRouters, edges):
+    routers = []
+    for i in range(numRouters):
+        routers.append(Router(i, numRouters))
+        routers[i].maxQueueSize = SCALING_MAX_QUEUE_SIZE
+    for idA, idB, bandwidth in edges:
+        createMutualConnection(routers[idA], routers[idB], bandwidth)
+    return routers
+
+# builds the batch network for a generated topology
+def buildBatchNetwork(numRouters, edges):
+    from batch import BatchNetwork
+    links = []
+    for idA, idB, bandwidth in edges:
+        links.append((idA, idB, bandwidth))
+        links.append((idB, idA, bandwidth))
+    network = BatchNetwork(numRouters, links)
+    network.maxQueueSize[:] = SCALING_MAX_QUEUE_SIZE
+    return network
+
+# runCase with the batch backend
+def runBatchCase(case):
+    name, size, ticks, packets, useScheduler, seed, useProfiler, useBatch = case
+    rng = random.Random(seed)
+
+    start = clock.perf_counter()
+    numRouters, edges = TOPOLOGY_GENERATORS[name](size, rng)
+    network = buildBatchNetwork(numRouters, edges)
+    setupSeconds = clock.perf_counter() - start
+
+    start = clock.perf_counter()
+    time = network.runUntilConverged(SCALING_MAX_CONVERGENCE_TICKS, SCALING_CONVERGENCE_QUIET_TICKS, 0)
+    convergenceTicks = network.lastChange
+    convergenceSeconds = clock.perf_counter() - start
+
+    for i in range(packets):
+        sourceID = rng.randrange(numRouters)
+        destinationID = rng.randrange(numRouters)
+        if(sourceID != destinationID):
+            network.inject(sourceID, destinationID, SCALING_PACKET_SIZE)
+
+    forwardedBefore = int(network.packetsForwarded.sum())
+    start = clock.perf_counter()
+    network.run(ticks, time)
+    elapsed = clock.perf_counter() - start
+    forwarded = int(network.packetsForwarded.sum()) - forwardedBefore
+
+    return {
+        "topology": name,
+        "routers": numRouters,
+        "connections": len(edges),
+        "backend": "batch",
+        "scheduler": False,
+        "seed": seed,
+        "setup_seconds": setupSeconds,
+        "convergence_ticks": convergenceTicks,
+        "convergence_seconds": convergenceSeconds,
+        "ticks_per_second": ticks / elapsed,
+        "packets_forwarded_per_second": forwarded / elapsed,
+        "control_bytes": int(network.controlBytesSent.sum()),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+# runs one benchmark case, returns its result row
+def runCase(case):
+    name, size, ticks, packets, useScheduler, seed, useProfiler, useBatch = case
+    if(useBatch):
+        return runBatchCase(case)
+    rng = random.Random(seed)
+
+    start = clock.perf_counter()
+    numRouters, edges = TOPOLOGY_GENERATORS[name](size, rng)
+    routers = buildRouters(numRouters, edges)
+    scheduler = EventScheduler(routers) if useScheduler else None
+    profiler = None
+    if(useProfiler):
+        profiler = PhaseProfiler()
+        profiler.attach(routers)
+    setupSeconds = clock.perf_counter() - start
+
+    start = clock.perf_counter()
+    detector = ConvergenceDetector(routers, scheduler)
+    time = detector.runUntilConverged(SCALING_MAX_CONVERGENCE_TICKS, SCALING_CONVERGENCE_QUIET_TICKS, 0)
+    convergenceTicks = detector.lastChange
+    convergenceSeconds = clock.perf_counter() - start
+
+    for i in range(packets):
+        source = routers[rng.randrange(numRouters)]
+        destination = routers[rng.randrange(numRouters)]
+        if(source != destination):
+            source.queuePacket(Packet(source, destination, SCALING_PACKET_SIZE, None, None, False), source)
+
+    forwardedBefore = sum(router.packetsForwarded for router in routers)
+    start = clock.perf_counter()
+    runSimulationForTime(routers, ticks, time, scheduler)
+    elapsed = clock.perf_counter() - start
+    forwarded = sum(router.packetsForwarded for router in routers) - forwardedBefore
+
+    result = {
+        "topology": name,
+        "routers": numRouters,
+        "connections": len(edges),
+        "backend": "router",
+        "scheduler": useScheduler,
+        "seed": seed,
+        "setup_seconds": setupSeconds,
+        "convergence_ticks": convergenceTicks,
+        "convergence_seconds": convergenceSeconds,
+        "ticks_per_second": ticks / elapsed,
+        "packets_forwarded_per_second": forwarded / elapsed,
+        "control_bytes": sum(router.controlBytesSent for router in routers),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    if(profiler != None):
+        result["phase_seconds"] = dict(profiler.times)
+        result["profile_report"] = profiler.formatReport()
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="router simulation scaling benchmark")
+    parser.add_argument("--topologies", default=SCALING_DEFAULT_TOPOLOGIES)
+    parser.add_argument("--sizes", default=SCALING_DEFAULT_SIZES)
+    parser.add_argument("--ticks", type=int, default=200, help="ticks timed after convergence")
+    parser.add_argument("--packets", type=int, default=-1, help="data packets injected, default one per router")
+    parser.add_argument("--scheduler", action="store_true", help="use the event scheduler")
+    parser.add_argument("--batch", action="store_true", help="run the numpy batch backend instead of Router objects")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", action="store_true", help="time each phase of timeTick and print a hot spot report")
+    parser.add_argument("--output", default="bench_output.jsonl")
+    args = parser.parse_args()
+    if(args.batch and (args.scheduler or args.profile)):
+        parser.error("--batch can't be used with --scheduler or --profile")
+
+    cases = []
+    for name in args.topologies.split(","):
+        for size in args.sizes.split(","):
+            packets = args.packets if args.packets >= 0 else int(size)
+            cases.append((name, int(size), args.ticks, packets, args.scheduler, args.seed, args.profile, args.batch))
+
+    # fresh process per case so the memory high water mark belongs to that case
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool, open(args.output, "a") as output:
+        for result in pool.imap(runCase, cases):
+            report = result.pop("profile_report", None)
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            print(result["topology"] + " " + str(result["routers"]) + " " + result["backend"] + ": converged at tick " + str(result["convergence_ticks"])
+                  + ", " + str(round(result["ticks_per_second"], 1)) + " ticks/s, "
+                  + str(round(result["packets_forwarded_per_second"], 1)) + " forwarded/s, "
+                  + str(result["control_bytes"]) + " control bytes, " + str(result["peak_rss_kb"]) + " KB peak")
+            if(report != None):
+                print(report)
@@ -0,0 +1,93 @@
+from scheduler import runRouters
+
+# Convergence detection. routers report to a ConvergenceDetector through
+# Router.convergence: every routing table entry changed by updateRoutingTable, and every
+# packet entering or leaving a router's queue. that lets a run stop the tick the network
+# settles instead of after a fixed number of ticks:
+#
+#   converged --> no routing table entry has changed for quietTicks ticks
+#   drained   --> no router has a packet queued or on its link
+#
+# packets in a Router.outbox (barrier simulations) aren't held by any router, so drained
+# is only meaningful when packets are delivered directly.
+class ConvergenceDetector:
+    def __init__(self, routers, scheduler = None):
+        self.routers = routers
+        self.scheduler = scheduler # event scheduler driving the routers, if any
+        self.time = 0 # tick being run, when the routers are ticked by the detector
+        self.lastChange = 0 # time after the tick of the last routing table change
+        self.changes = 0 # routing table entries changed
+        self.held = 0 # packets queued or on a link
+        self.converged = False
+        self.drained = False
+        self.stopWhenDrained = False
+        self.stopping = False
+
+        for router in routers:
+            router.convergence = self
+            self.held += len(router.queuedPackets)
+            if(router.currentPacket != None):
+                self.held += 1
+
+    # called by a router when updateRoutingTable changes an entry
+    def routeChanged(self):
+        self.changes += 1
+        if(self.scheduler != None and self.scheduler.running):
+            self.lastChange = self.scheduler.time + 1
+        else:
+            self.lastChange = self.time + 1
+
+    # called by a router when packets are added to (positive) or leave (negative) its
+    # queue or link
+    def packetsHeld(self, count):
+        self.held += count
+        if(self.held == 0 and self.stopWhenDrained):
+            self.drained = True
+            self.stopping = True
+            if(self.scheduler != None):
+                self.scheduler.stop()
+
+    # runs the simulation for up to timeToRun steps starting at time, returns the end time.
+    # stops early after the tick in which a stop was requested
+    def run(self, timeToRun, time):
+        if(self.scheduler != None):
+            return runRouters(self.routers, timeToRun, time, self.scheduler)
+        return runRouters(self.routers, timeToRun, time, None, self.startTick)
+
+    # tick hook for runRouters without a scheduler, which stops the run by itself
+    def startTick(self, time):
+        self.time = time
+        if(self.stopping):
+            return None
+        return time + 1
+
+    # runs until no routing table entry has changed for quietTicks ticks, or until maxTicks
+    # have run. returns the time it stopped at, which is lastChange + quietTicks if the
+    # routing converged (see converged)
+    def runUntilConverged(self, maxTicks, quietTicks, time):
+        startTime = time
+        self.lastChange = time
+        self.converged = False
+        while(True):
+            quietTime = self.lastChange + quietTicks
+            if(time >= quietTime):
+                self.converged = True
+                return time
+            if(time - startTime >= maxTicks):
+                return time
+            # nothing can converge before quietTime, so run straight up to it
+            time = self.run(min(quietTime, startTime + maxTicks) - time, time)
+
+    # runs until no packet is queued or on a link anywhere, or until maxTicks have run.
+    # returns the time it stopped at, the time after the tick that drained the network
+    # if it did (see drained)
+    def runUntilDrained(self, maxTicks, time):
+        self.drained = self.held == 0
+        if(self.drained):
+            return time
+        self.stopWhenDrained = True
+        self.stopping = False
+        time = self.run(maxTicks, time)
+        self.stopWhenDrained = False
+        self.stopping = False
+        return time
@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import json
+import pickle
+from router import *
+
+# Real time emulation. every router runs as its own asyncio task, ticking at a wall clock
+# rate instead of as fast as possible, so tools can be pointed at a network that behaves
+# like a live one. like the barrier simulations (parallel.py) routers send through
+# Router.outbox: after each tick a router's task hands what it sent to the inbox
+# (asyncio.Queue) of each receiving router, or over UDP on loopback, and a router takes
+# what's in its inbox at the start of its next tick.
+#
+# packets injected through the emulation report back when they're delivered, dropped or
+# traced, with their latency in wall clock milliseconds and in ticks. routers report
+# delivered and dropped packets through Router.traffic, so a TrafficGenerator can't be
+# attached at the same time.
+#
+#   emulation = Emulation(routers, tickRate=50)
+#   await emulation.start(controlPort=8400)
+#   result = await emulation.inject(0, 5, 10)  # {"event": "delivered", "latency_ms": ...}
+#   await emulation.stop()
+#
+# the control server takes one JSON object per line and answers each with one line,
+# echoing the request's "id" if it has one:
+#   {"op": "inject", "source": 0, "destination": 5, "size": 10} --> delivered or dropped
+#   {"op": "trace", "source": 0, "destination": 5}              --> trace with path and cost
+#   {"op": "status"}                                            --> tick and counters
+#
+# UDP packets are pickled, so only run it on a machine whose local users are trusted
+
+EMULATION_TICK_RATE = 100 # ticks per wall clock second
+EMULATION_HOST = "127.0.0.1"
+EMULATION_TRANSPORT_QUEUE = "queue"
+EMULATION_TRANSPORT_UDP = "udp"
+EMULATION_CONTROL_PORT = 8400
+
+# Packet.information of packets injected through the emulation
+class EmulationTag:
+    __slots__ = ("requestID", "sentTick")
+
+    def __init__(self, requestID, sentTick):
+        self.requestID = requestID
+        self.sentTick = sentTick
+
+# receives one router's packets over UDP
+class EmulationProtocol(asyncio.DatagramProtocol):
+    def __init__(self, emulation, routerID):
+        self.emulation = emulation
+        self.routerID = routerID
+
+    def datagram_received(self, data, address):
+        senderID, record = pickle.loads(data)
+        packet = Packet.fromRecord(record, self.emulation.routers)
+        self.emulation.inboxes[self.routerID].put_nowait((packet, senderID))
+
+class Emulation:
+    def __init__(self, routers, tickRate = EMULATION_TICK_RATE, transport = EMULATION_TRANSPORT_QUEUE):
+        if(transport not in (EMULATION_TRANSPORT_QUEUE, EMULATION_TRANSPORT_UDP)):
+            raise ValueError("unknown emulation transport: " + str(transport))
+        self.routers = routers
+        self.tickRate = tickRate
+        self.transport = transport
+        self.time = 0 # last tick run by any router, kept up to date by the routers
+        self.routerTicks = [0] * len(routers) # tick each router is on
+        self.inboxes = []
+        self.endpoints = [] # UDP transport of each router
+        self.addresses = [] # UDP address of each router
+        self.tasks = []
+        self.server = None
+        self.clients = set() # handleClient task of each control connection
+        self.controlPort = None
+        self.loop = None
+        self.running = False
+        self.startTime = 0
+        self.startWallTime = 0
+
+        self.pending = {} # requestID -> (future, wall clock time sent)
+        self.nextRequestID = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.traced = 0
+        self.latencyTotal = 0 # milliseconds, over delivered packets
+        self.lateTicks = 0 # ticks that started more than a tick after their wall clock deadline
+
+    # starts every router's task at the given tick, and the control server if a port is
+    # given (0 picks a free port, see controlPort)
+    async def start(self, time = 0, controlPort = None):
+        self.loop = asyncio.get_running_loop()
+        self.inboxes = [asyncio.Queue() for router in self.routers]
+        for router in self.routers:
+            router.outbox = []
+            router.traffic = self
+        if(self.transport == EMULATION_TRANSPORT_UDP):
+            for router in self.routers:
+                endpoint, protocol = await self.loop.create_datagram_endpoint(
+                    lambda routerID = router.routerID: EmulationProtocol(self, routerID), local_addr=(EMULATION_HOST, 0))
+                self.endpoints.append(endpoint)
+                self.addresses.append(endpoint.get_extra_info("sockname"))
+
+        self.running = True
+        self.startTime = time
+        self.startWallTime = self.loop.time()
+        self.tasks = [self.loop.create_task(self.runRouter(router)) for router in self.routers]
+        if(controlPort != None):
+            self.server = await asyncio.start_server(self.handleClient, EMULATION_HOST, controlPort)
+            self.controlPort = self.server.sockets[0].getsockname()[1]
+
+    # stops the routers after their current tick and closes the sockets and control
+    # connections. requests still waiting for an answer are cancelled. returns the tick
+    # after the last one run
+    async def stop(self):
+        self.running = False
+        await asyncio.gather(*self.tasks)
+        self.tasks = []
+        if(self.server != None):
+            self.server.close()
+            clients = list(self.clients)
+            for client in clients:
+                client.cancel()
+            await asyncio.gather(*clients, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+        for endpoint in self.endpoints:
+            endpoint.close()
+        self.endpoints = []
+        self.addresses = []
+        for future, sentWallTime in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        for router in self.routers:
+            router.outbox = None
+            router.traffic = None
+        return max(self.routerTicks)
+
+    # runs the emulation for the given wall clock seconds, returns the tick after the last one run
+    async def run(self, seconds, time = 0, controlPort = None):
+        await self.start(time, controlPort)
+        await asyncio.sleep(seconds)
+        return await self.stop()
+
+    # one router's task: waits for the wall clock time of each tick, takes in the packets
+    # sent to it, ticks, and sends on what it sent
+    async def runRouter(self, router):
+        loop = self.loop
+        inbox = self.inboxes[router.routerID]
+        tick = self.startTime
+        while(self.running):
+            delay = self.startWallTime + (tick - self.startTime) / self.tickRate - loop.time()
+            if(delay > 0):
+                await asyncio.sleep(delay)
+            else:
+                # behind, still let the other routers run
+                if(delay < -1 / self.tickRate):
+                    self.lateTicks += 1
+                await asyncio.sleep(0)
+            if(not self.running):
+                break
+
+            self.routerTicks[router.routerID] = tick
+            while(not inbox.empty()):
+                packet, senderID = inbox.get_nowait()
+                self.deliver(router, packet, senderID)
+            router.timeTick(tick)
+            self.dispatch(router)
+            tick += 1
+            self.routerTicks[router.routerID] = tick
+
+    # hands a packet from the inbox to its router. traces for this emulation are answered
+    # here, and only passed on to the router if its metrics should record them
+    def deliver(self, router, packet, senderID):
+        meta = packet.meta_info
+        if(meta != None and meta.meta_type == 2 and packet.getDestinationID() == router.routerID
+           and isinstance(packet.information, EmulationTag)):
+            path = list(meta.meta_table[0]) + [router.routerID]
+            self.traced += 1
+            self.answer(packet.information, router.routerID, {"event": "trace", "path": path, "cost": meta.meta_table[1]})
+            if(router.metrics == None):
+                CONTROL_PACKET_POOL.release(packet)
+                return
+        router.queuePacket(packet, self.routers[senderID])
+
+    # sends everything a router sent during its tick on to the receiving routers
+    def dispatch(self, router):
+        outbox = router.outbox
+        for destID, senderID, packet in outbox:
+            if(self.transport == EMULATION_TRANSPORT_UDP):
+                self.endpoints[senderID].sendto(pickle.dumps((senderID, packet.toRecord()), pickle.HIGHEST_PROTOCOL),
+                                                self.addresses[destID])
+            else:
+                self.inboxes[destID].put_nowait((packet, senderID))
+        outbox.clear()
+
+    # queues a data packet at its source router on its next tick. returns a future with
+    # the delivered or dropped result
+    def inject(self, sourceID, destinationID, size):
+        source = self.routers[sourceID]
+        future, tag = self.newRequest(sourceID)
+        packet = Packet(source, self.routers[destinationID], size, tag, None, False)
+        self.inboxes[sourceID].put_nowait((packet, sourceID))
+        return future
+
+    # sends a trace packet from its source router on its next tick. returns a future with
+    # the trace result: the routers it went through and the total cost
+    def trace(self, sourceID, destinationID):
+        source = self.routers[sourceID]
+        future, tag = self.newRequest(sourceID)
+        packet = Packet_META_Crafter.RoutingInfoTracePacket(source, self.routers[destinationID])
+        packet.information = tag
+        self.inboxes[sourceID].put_nowait((packet, sourceID))
+        return future
+
+    def newRequest(self, sourceID):
+        requestID = self.nextRequestID
+        self.nextRequestID += 1
+        future = self.loop.create_future()
+        self.pending[requestID] = (future, self.loop.time())
+        return future, EmulationTag(requestID, self.routerTicks[sourceID])
+
+    # resolves a request's future with result plus its latency, measured at routerID
+    def answer(self, tag, routerID, result):
+        request = self.pending.pop(tag.requestID, None)
+        if(request == None):
+            return None
+        future, sentWallTime = request
+        result["latency_ms"] = (self.loop.time() - sentWallTime) * 1000
+        result["latency_ticks"] = self.routerTicks[routerID] - tag.sentTick
+        if(not future.done()):
+            future.set_result(result)
+        return result
+
+    # called by the destination router when a data packet arrives
+    def packetDelivered(self, packet):
+        tag = packet.information
+        if(isinstance(tag, EmulationTag)):
+            result = self.answer(tag, packet.getDestinationID(), {"event": "delivered"})
+            if(result != None):
+                self.delivered += 1
+                self.latencyTotal += result["latency_ms"]
+
+    # called by a router when it drops a packet
+    def packetDropped(self, packet):
+        tag = packet.information
+        if(isinstance(tag, EmulationTag)):
+            if(self.answer(tag, packet.getSourceID(), {"event": "dropped"}) != None):
+                self.dropped += 1
+
+    def getStatus(self):
+        return {
+            "tick": min(self.routerTicks) if len(self.routerTicks) != 0 else self.startTime,
+            "routers": len(self.routers),
+            "tick_rate": self.tickRate,
+            "transport": self.transport,
+            "pending": len(self.pending),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "traced": self.traced,
+            "mean_latency_ms": self.latencyTotal / self.delivered if self.delivered != 0 else -1,
+            "late_ticks": self.lateTicks,
+        }
+
+    # control server connection: answers requests in the order they finish, so a slow
+    # delivery doesn't hold up the ones after it. stop cancels it along with its
+    # unanswered requests
+    async def handleClient(self, reader, writer):
+        task = asyncio.current_task()
+        self.clients.add(task)
+        answers = []
+        try:
+            while(True):
+                line = await reader.readline()
+                if(len(line) == 0):
+                    break
+                if(len(line.strip()) != 0):
+                    answers.append(self.loop.create_task(self.handleRequest(line, writer)))
+            await asyncio.gather(*answers, return_exceptions=True)
+        except asyncio.CancelledError:
+            for answer in answers:
+                answer.cancel()
+            await asyncio.gather(*answers, return_exceptions=True)
+        finally:
+            self.clients.discard(task)
+            writer.close()
+
+    async def handleRequest(self, line, writer):
+        request = {}
+        try:
+            request = json.loads(line)
+            op = request.get("op")
+            if(op == "inject"):
+                result = await self.inject(int(request["source"]), int(request["destination"]), int(request.get("size", 1)))
+            elif(op == "trace"):
+                result = await self.trace(int(request["source"]), int(request["destination"]))
+            elif(op == "status"):
+                result = self.getStatus()
+            else:
+                result = {"error": "unknown op: " + str(op)}
+        except (ValueError, KeyError, IndexError, TypeError) as error:
+            result = {"error": str(error)}
+        if(isinstance(request, dict) and "id" in request):
+            result["id"] = request["id"]
+        writer.write((json.dumps(result) + "\n").encode())
+        await writer.drain()
+
+# python emulation.py --rate 50 --port 8400, runs the network in the .ri files until interrupted
+if __name__ == "__main__":
+    from main import countRoutersInFile, createRouterConnectionsFromFile, setupRouterVariablesFromFile
+    parser = argparse.ArgumentParser(description="real time router network emulation")
+    parser.add_argument("--connections", default="connection_info.ri")
+    parser.add_argument("--router-info", default="router_info.ri")
+    parser.add_argument("--rate", type=float, default=EMULATION_TICK_RATE, help="ticks per second")
+    parser.add_argument("--udp", action="store_true", help="send packets over UDP on loopback")
+    parser.add_argument("--port", type=int, default=EMULATION_CONTROL_PORT, help="control server port")
+    parser.add_argument("--seconds", type=float, default=None, help="stop after this long")
+    args = parser.parse_args()
+
+    numRouters = countRoutersInFile(args.connections)
+    routers = [Router(i, numRouters) for i in range(numRouters)]
+    createRouterConnectionsFromFile(routers, args.connections)
+    setupRouterVariablesFromFile(routers, args.router_info)
+    emulation = Emulation(routers, args.rate, EMULATION_TRANSPORT_UDP if args.udp else EMULATION_TRANSPORT_QUEUE)
+
+    async def emulate():
+        await emulation.start(controlPort=args.port)
+        print("emulating " + str(len(routers)) + " routers at " + str(args.rate) + " ticks/s, control port " + str(emulation.controlPort))
+        try:
+            if(args.seconds != None):
+                await asyncio.sleep(args.seconds)
+            else:
+                await asyncio.Event().wait()
+        finally:
+            tick = await emulation.stop()
+            print("stopped at tick " + str(tick) + ": " + json.dumps(emulation.getStatus()))
+
+    try:
+        asyncio.run(emulate())
+    except KeyboardInterrupt:
+        pass
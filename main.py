@@ -1,130 +1,137 @@
-from router import *
-
-# Creates a 2 way connection between two routers
-def createMutualConnection(routerA, routerB, bandwidth):
-    routerA.createConnection(routerB, bandwidth, 0)
-    routerB.createConnection(routerA, bandwidth, 0)
-
-# Runs simulation for timeToRun steps
-def runSimulationForTime(routers, timeToRun, time):
-    for i in range(timeToRun):
-        for j in range(len(routers)):
-            routers[j].timeTick(time)
-        time = time + 1
-
-# uses the connection_info.ri file to create connections between the given
-# array of routers
-def createRouterConnectionsFromFile(routers):
-    file = open("connection_info.ri", "r")
-    file_content = file.read()
-
-    content = file_content.split(",")
-    
-    for i in range(len(content)):
-        content[i] = content[i].replace('\n', "")
-        entry = content[i].split("|")
-
-        idA = int(entry[0])
-        idB = int(entry[1])
-        bandwidth = int(entry[2])
-        createMutualConnection(routers[idA], routers[idB], bandwidth)
-
-# uses router_info.ri file to setup variables
-def setupRouterVariablesFromFile(routers):
-    file = open("router_info.ri", "r")
-    file_content = file.read()
-
-    content = file_content.split(",")
-    
-    for i in range(len(content)):
-        content[i] = content[i].replace('\n', "")
-        entry = content[i].split("|")
-        maxQueueSize = int(entry[0])
-        routers[i].maxQueueSize = maxQueueSize
-
-
-if __name__ == "__main__":
-    numRouters = 16
-    routers = []
-    for i in range(numRouters):
-        routers.append(Router(i, numRouters))
-
-    createRouterConnectionsFromFile(routers)
-    setupRouterVariablesFromFile(routers)
-
-    time = 0
-    runSimulationForTime(routers, 50, time)
-
-    # desynchronize router broadcasts
-    for i in range(50):
-        for j in range(len(routers)):
-            if(random.random() > 0.5):
-                routers[j].timeTick(time)
-        time = time + 1
-
-    # Trace packet demonstrating the path taken from router 0 to router 15
-    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
-    routers[0].queuePacket(tracePacket, routers[0])
-
-    runSimulationForTime(routers, 50, time)
-
-    print("\nBEGIN: NETWORK BANDWIDTH TEST; 54 LARGE PACKETS SENT FROM r0, r1, r2, r13, r14, r15")
-    # send lots of packets from the left side of the network to the right side of the network
-    # to demonstrate the throughput of the network
-    for i in range(3):
-        for j in range(9):
-            dataPacket = Packet(routers[i], routers[15], 10, "Test Packet", None, False)
-            routers[i].queuePacket(dataPacket, routers[i])
-    for i in range(3):
-        for j in range(9):
-            dataPacket = Packet(routers[15 - i], routers[4], 10, "Test Packet", None, False)
-            routers[15 - i].queuePacket(dataPacket, routers[i])
-
-    runSimulationForTime(routers, 50, time)
-
-    print("\nBegin packet traces during high network use")
-    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
-    routers[0].queuePacket(tracePacket, routers[0])
-
-    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[2], routers[15])
-    routers[2].queuePacket(tracePacket, routers[2])
-
-    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[13], routers[4])
-    routers[13].queuePacket(tracePacket, routers[13])
-
-    runSimulationForTime(routers, 1000, time)
-
-
-
-    runSimulationForTime(routers, 50, time)
-
-    print("\nPacket trace 50 ticks after network cleared")
-    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
-    routers[0].queuePacket(tracePacket, routers[0])
-
-    runSimulationForTime(routers, 100, time)
-
-    print("END: NETWORK BANDWIDTH TEST\n")
-
-
-    
-    #Demonstration of a router failure and subsequent network reaction
-    routers[3].forceRouterFailure()
-
-    print("\nForcing Router 3 to fail. Sending trace packet after 5 network ticks.")
-    runSimulationForTime(routers, 5, time)
-
-    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
-    routers[0].queuePacket(tracePacket, routers[2])
-    runSimulationForTime(routers, 50, time)
-
-    routers[6].forceRouterFailure()
-
-    print("\nForcing Router 6 to fail. Sending trace packet after 5 network ticks.")
-    runSimulationForTime(routers, 5, time)
-
-    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
-    routers[0].queuePacket(tracePacket, routers[2])
-
-    runSimulationForTime(routers, 50, time)
+from router import *
+from scheduler import EventScheduler, runRouters
+from convergence import ConvergenceDetector
+from topology import *
+from traffic import *
+
+MAIN_MAX_CONVERGENCE_TICKS = 1000
+MAIN_MAX_DRAIN_TICKS = 1000
+
+# Creates a 2 way connection between two routers
+def createMutualConnection(routerA, routerB, bandwidth):
+    routerA.createConnection(routerB, bandwidth, 0)
+    routerB.createConnection(routerA, bandwidth, 0)
+
+# Runs simulation for timeToRun steps. if a scheduler is given, only routers with
+# work to do are ticked
+def runSimulationForTime(routers, timeToRun, time, scheduler = None):
+    return runRouters(routers, timeToRun, time, scheduler)
+
+# uses the connection_info.ri file to create connections between the given
+# array of routers
+def createRouterConnectionsFromFile(routers, path = "connection_info.ri"):
+    for idA, idB, bandwidth in iterEdgesFromFile(path):
+        createMutualConnection(routers[idA], routers[idB], bandwidth)
+
+# uses router_info.ri file to setup variables
+def setupRouterVariablesFromFile(routers, path = "router_info.ri"):
+    i = 0
+    for maxQueueSize in iterRouterInfoFromFile(path):
+        routers[i].maxQueueSize = maxQueueSize
+        i += 1
+
+# creates and connects routers from a binary topology file (see topology.py)
+def createRoutersFromBinaryFile(path):
+    with BinaryTopology(path) as topology:
+        routers = []
+        for i in range(topology.numRouters):
+            routers.append(Router(i, topology.numRouters))
+            maxQueueSize = topology.getMaxQueueSize(i)
+            if(maxQueueSize != -1):
+                routers[i].maxQueueSize = maxQueueSize
+        for idA, idB, bandwidth in topology.iterEdges():
+            createMutualConnection(routers[idA], routers[idB], bandwidth)
+    return routers
+
+
+if __name__ == "__main__":
+    numRouters = countRoutersInFile("connection_info.ri")
+    routers = []
+    for i in range(numRouters):
+        routers.append(Router(i, numRouters))
+
+    createRouterConnectionsFromFile(routers)
+    setupRouterVariablesFromFile(routers)
+    scheduler = EventScheduler(routers)
+
+    # traces are printed as they complete, drops are summarized after the bandwidth test
+    metrics = Metrics(numRouters, echo=[EVENT_TRACE])
+    metrics.attach(routers)
+
+    # warm up until routing converges
+    detector = ConvergenceDetector(routers, scheduler)
+    time = detector.runUntilConverged(MAIN_MAX_CONVERGENCE_TICKS, 2 * ROUTER_BROADCAST_FREQUENCY + 1, 0)
+    print("Routing converged at tick " + str(detector.lastChange))
+
+    # desynchronize router broadcasts
+    for i in range(50):
+        for j in range(len(routers)):
+            if(random.random() > 0.5):
+                routers[j].timeTick(time)
+        time = time + 1
+
+    # Trace packet demonstrating the path taken from router 0 to router 15
+    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
+    routers[0].queuePacket(tracePacket, routers[0])
+
+    runSimulationForTime(routers, 50, time, scheduler)
+
+    print("\nBEGIN: NETWORK BANDWIDTH TEST; 54 LARGE PACKETS SENT FROM r0, r1, r2, r13, r14, r15")
+    # send lots of packets from the left side of the network to the right side of the network
+    # to demonstrate the throughput of the network, a burst of 9 packets per flow
+    flows = []
+    for i in range(3):
+        flows.append(Flow(len(flows), i, 15, BurstArrivals(9), ConstantSize(10), time))
+        flows.append(Flow(len(flows), 15 - i, 4, BurstArrivals(9), ConstantSize(10), time))
+    traffic = TrafficGenerator(routers, flows, scheduler=scheduler)
+    traffic.run(50, time)
+
+    print("\nBegin packet traces during high network use")
+    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
+    routers[0].queuePacket(tracePacket, routers[0])
+
+    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[2], routers[15])
+    routers[2].queuePacket(tracePacket, routers[2])
+
+    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[13], routers[4])
+    routers[13].queuePacket(tracePacket, routers[13])
+
+    time = detector.runUntilDrained(MAIN_MAX_DRAIN_TICKS, time)
+    print("Network drained at tick " + str(time))
+
+
+    runSimulationForTime(routers, 50, time, scheduler)
+
+    print("\nPacket trace 50 ticks after network cleared")
+    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
+    routers[0].queuePacket(tracePacket, routers[0])
+
+    runSimulationForTime(routers, 100, time, scheduler)
+
+    print(traffic.formatReport())
+    summary = metrics.getSummary()
+    print("Packets dropped: " + str(summary["drops_queue_full"]) + " (queue size exceeded), " + str(summary["drops_no_route"]) + " (no route found)")
+    print("END: NETWORK BANDWIDTH TEST\n")
+
+
+    
+    #Demonstration of a router failure and subsequent network reaction
+    routers[3].forceRouterFailure()
+
+    print("\nForcing Router 3 to fail. Sending trace packet after 5 network ticks.")
+    runSimulationForTime(routers, 5, time, scheduler)
+
+    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
+    routers[0].queuePacket(tracePacket, routers[2])
+    runSimulationForTime(routers, 50, time, scheduler)
+
+    routers[6].forceRouterFailure()
+
+    print("\nForcing Router 6 to fail. Sending trace packet after 5 network ticks.")
+    runSimulationForTime(routers, 5, time, scheduler)
+
+    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[0], routers[15])
+    routers[0].queuePacket(tracePacket, routers[2])
+
+    runSimulationForTime(routers, 50, time, scheduler)
     
\ No newline at end of file
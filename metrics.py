@@ -0,0 +1,202 @@
+import csv
+import json
+from array import array
+
+# Metrics and event log for a simulation. routers report to it through Router.metrics,
+# which is None by default so instrumentation costs one attribute check when it's off.
+#
+# counters are kept per router in flat arrays, and discrete events go into a
+# preallocated ring buffer that keeps the newest METRICS_EVENT_CAPACITY events and is
+# exported in bulk with exportEvents.
+
+METRICS_EVENT_CAPACITY = 1 << 16
+METRICS_QUEUE_HISTOGRAM_BINS = 16 # queue depths above the last bin are counted in it
+
+# event kinds
+EVENT_DROP = 0
+EVENT_THROTTLE = 1
+EVENT_ROUTE_CHANGE = 2
+EVENT_TRACE = 3
+EVENT_NAMES = ["drop", "throttle", "route_change", "trace"]
+
+# drop causes
+DROP_QUEUE_FULL = 0
+DROP_NO_ROUTE = 1
+DROP_CAUSE_NAMES = ["queue_full", "no_route"]
+
+# event fields, by kind:
+#   drop         --> router, other: sender id, code: drop cause, value: packet size
+#   throttle     --> router, other: neighbor id, value: new throttle percent
+#   route_change --> router, other: destination id, code: next hop id, value: cost
+#   trace        --> router: destination id, other: source id, value: cost, detail: path
+EVENT_FIELDS = ["time", "kind", "router", "other", "code", "value", "detail"]
+
+# fixed size ring buffer of events stored column wise
+class EventLog:
+    def __init__(self, capacity = METRICS_EVENT_CAPACITY):
+        self.capacity = capacity
+        self.times = array("q", [0]) * capacity
+        self.kinds = array("b", [0]) * capacity
+        self.routers = array("i", [0]) * capacity
+        self.others = array("i", [0]) * capacity
+        self.codes = array("i", [0]) * capacity
+        self.values = array("d", [0]) * capacity
+        self.details = [None] * capacity
+        self.next = 0 # slot the next event goes in
+        self.count = 0 # events recorded since the last clear, including overwritten ones
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def record(self, time, kind, routerID, other, code, value, detail = None):
+        i = self.next
+        self.times[i] = time
+        self.kinds[i] = kind
+        self.routers[i] = routerID
+        self.others[i] = other
+        self.codes[i] = code
+        self.values[i] = value
+        self.details[i] = detail
+        self.next = i + 1 if i + 1 != self.capacity else 0
+        self.count += 1
+
+    # number of events that were overwritten before being exported
+    def getOverwritten(self):
+        return max(0, self.count - self.capacity)
+
+    # yields events oldest first as tuples in EVENT_FIELDS order
+    def iterEvents(self):
+        length = len(self)
+        start = (self.next - length) % self.capacity
+        for j in range(length):
+            i = (start + j) % self.capacity
+            yield (self.times[i], self.kinds[i], self.routers[i], self.others[i], self.codes[i], self.values[i], self.details[i])
+
+    def clear(self):
+        self.next = 0
+        self.count = 0
+        for i in range(self.capacity):
+            self.details[i] = None
+
+# per router counters plus the event log
+class Metrics:
+    def __init__(self, numRouters, eventCapacity = METRICS_EVENT_CAPACITY, echo = ()):
+        self.numRouters = numRouters
+        self.time = 0 # time of the tick being simulated, kept up to date by the routers
+        self.events = EventLog(eventCapacity)
+        self.echo = set(echo) # event kinds that are also printed as they happen
+
+        self.drops = [array("q", [0]) * numRouters for cause in DROP_CAUSE_NAMES]
+        self.forwarded = array("q", [0]) * numRouters
+        self.ticks = array("q", [0]) * numRouters
+        self.queueHistogram = array("q", [0]) * (numRouters * METRICS_QUEUE_HISTOGRAM_BINS)
+        self.linkBusyTicks = {} # (routerID, neighborID) -> ticks spent sending on that link
+
+    # makes the routers report to this
+    def attach(self, routers):
+        for router in routers:
+            router.metrics = self
+
+    # one tick of a router: its queue length after the tick, and the neighbor it is
+    # sending to (-1 if idle). count lets skipped ticks be recorded at once
+    def recordTick(self, routerID, queueLength, sendingTo, count = 1):
+        self.ticks[routerID] += count
+        bin = min(queueLength, METRICS_QUEUE_HISTOGRAM_BINS - 1)
+        self.queueHistogram[routerID * METRICS_QUEUE_HISTOGRAM_BINS + bin] += count
+        if(sendingTo != -1):
+            link = (routerID, sendingTo)
+            self.linkBusyTicks[link] = self.linkBusyTicks.get(link, 0) + count
+
+    def recordForward(self, routerID):
+        self.forwarded[routerID] += 1
+
+    def recordDrop(self, routerID, cause, packet, senderID):
+        self.drops[cause][routerID] += 1
+        self.addEvent(EVENT_DROP, routerID, senderID, cause, packet.size)
+
+    def recordThrottle(self, routerID, neighborID, throttlePercent):
+        self.addEvent(EVENT_THROTTLE, routerID, neighborID, 0, throttlePercent)
+
+    def recordRouteChange(self, routerID, destID, nextHopID, cost):
+        self.addEvent(EVENT_ROUTE_CHANGE, routerID, destID, nextHopID, cost)
+
+    def recordTrace(self, sourceID, destID, path, cost):
+        self.addEvent(EVENT_TRACE, destID, sourceID, 0, cost, tuple(path))
+
+    def addEvent(self, kind, routerID, other, code, value, detail = None):
+        self.events.record(self.time, kind, routerID, other, code, value, detail)
+        if(kind in self.echo):
+            print(formatEvent((self.time, kind, routerID, other, code, value, detail)))
+
+    # returns the recorded events of one kind, oldest first
+    def getEvents(self, kind):
+        return [event for event in self.events.iterEvents() if event[1] == kind]
+
+    # returns the fraction of the router's observed ticks spent sending to the neighbor
+    def getLinkUtilization(self, routerID, neighborID):
+        if(self.ticks[routerID] == 0):
+            return 0
+        return self.linkBusyTicks.get((routerID, neighborID), 0) / self.ticks[routerID]
+
+    # totals over all routers
+    def getSummary(self):
+        summary = {"forwarded": sum(self.forwarded), "events": self.events.count,
+                   "events_overwritten": self.events.getOverwritten()}
+        for cause in range(len(DROP_CAUSE_NAMES)):
+            summary["drops_" + DROP_CAUSE_NAMES[cause]] = sum(self.drops[cause])
+        return summary
+
+    # writes the event log as JSONL or CSV, picked by the file extension
+    def exportEvents(self, path):
+        with open(path, "w", newline="") as output:
+            if(path.endswith(".csv")):
+                writer = csv.writer(output)
+                writer.writerow(EVENT_FIELDS)
+                for event in self.events.iterEvents():
+                    writer.writerow(toEventRow(event))
+            else:
+                for event in self.events.iterEvents():
+                    output.write(json.dumps(dict(zip(EVENT_FIELDS, toEventRow(event)))) + "\n")
+
+    # writes the per router counters as CSV
+    def exportCounters(self, path):
+        with open(path, "w", newline="") as output:
+            writer = csv.writer(output)
+            header = ["router", "ticks", "forwarded"] + ["drops_" + name for name in DROP_CAUSE_NAMES]
+            header += ["queue_" + str(bin) for bin in range(METRICS_QUEUE_HISTOGRAM_BINS)]
+            writer.writerow(header)
+            for routerID in range(self.numRouters):
+                row = [routerID, self.ticks[routerID], self.forwarded[routerID]]
+                row += [self.drops[cause][routerID] for cause in range(len(DROP_CAUSE_NAMES))]
+                start = routerID * METRICS_QUEUE_HISTOGRAM_BINS
+                row += list(self.queueHistogram[start:start + METRICS_QUEUE_HISTOGRAM_BINS])
+                writer.writerow(row)
+
+# event tuple with names in place of kind and drop cause codes
+def toEventRow(event):
+    time, kind, routerID, other, code, value, detail = event
+    if(kind == EVENT_DROP):
+        code = DROP_CAUSE_NAMES[code]
+    if(detail != None):
+        detail = list(detail)
+    return [time, EVENT_NAMES[kind], routerID, other, code, value, detail]
+
+# human readable event, traces use the same format as Packet_META.PrintRoutingTrace
+def formatEvent(event):
+    time, kind, routerID, other, code, value, detail = event
+    if(kind == EVENT_TRACE):
+        trace = "Routing Trace Packet from r" + str(other) + " to r" + str(routerID) + "\n"
+        trace += "Routing Trace Stack: " + " -> ".join("r" + str(hop) for hop in detail)
+        return trace + ", cost: " + str(value)
+    if(kind == EVENT_DROP):
+        if(code == DROP_NO_ROUTE):
+            return "Packet drop: no route found at r" + str(routerID)
+        message = "Packet drop: queue size exceeded at r" + str(routerID)
+        # the sender is only throttled for its own packet, not for older packets dropped
+        # to make room (other -1) or packets injected at the router itself
+        if(other != -1 and other != routerID):
+            message += ". Throttling connection to r" + str(other)
+        return message
+    if(kind == EVENT_THROTTLE):
+        return "Throttle: r" + str(routerID) + " -> r" + str(other) + " at " + str(value)
+    return "Route change: r" + str(routerID) + " to r" + str(other) + " via r" + str(code) + ", cost: " + str(value)
@@ -0,0 +1,247 @@
+import multiprocessing
+from collections import deque
+from router import *
+
+# Partitioned multi-process simulation.
+#
+# routers are split into partitions with a small edge cut and each partition is ticked
+# by its own worker process. to make that possible every packet a router sends to
+# another router goes to its outbox (Router.outbox) instead of being queued right away,
+# and all outboxes are delivered at a barrier between ticks in (sender id, send order)
+# order. BarrierSimulation runs the same barrier model in one process, and
+# ParallelSimulation gives exactly the same router states as it for the same topology.
+# workers keep packets between their own routers and only pass packets that cross
+# partitions through the parent, so the traffic between processes is the edge cut's.
+#
+# each tick is: deliver the previous tick's packets, then tick every router in id order.
+
+# stand in for a router owned by another worker. connections and packets only need its id
+class RemoteRouter:
+    __slots__ = ("routerID",)
+
+    def __init__(self, routerID):
+        self.routerID = routerID
+
+# splits routers into numParts partitions of about equal size, keeping connected routers
+# together. partitions are grown breadth first from unassigned routers, then routers on
+# a partition boundary are moved to the neighboring partition when it lowers the edge cut
+# without unbalancing the partitions. returns the partition of each router
+def partitionRouters(numRouters, edges, numParts):
+    neighbors = [[] for i in range(numRouters)]
+    for idA, idB, bandwidth in edges:
+        neighbors[idA].append(idB)
+        neighbors[idB].append(idA)
+
+    target = -(-numRouters // numParts) # ceiling division
+    partOf = [-1] * numRouters
+    sizes = [0] * numParts
+    part = 0
+    for seed in range(numRouters):
+        if(partOf[seed] != -1):
+            continue
+        frontier = deque([seed])
+        while(len(frontier) != 0):
+            routerID = frontier.popleft()
+            if(partOf[routerID] != -1):
+                continue
+            if(sizes[part] >= target):
+                part = min(part + 1, numParts - 1)
+            partOf[routerID] = part
+            sizes[part] += 1
+            for other in neighbors[routerID]:
+                if(partOf[other] == -1):
+                    frontier.append(other)
+
+    # one refinement pass over boundary routers
+    for routerID in range(numRouters):
+        current = partOf[routerID]
+        links = {}
+        for other in neighbors[routerID]:
+            links[partOf[other]] = links.get(partOf[other], 0) + 1
+        best = current
+        for other in sorted(links):
+            if(links[other] > links.get(best, 0) and sizes[other] < target and sizes[current] > 1):
+                best = other
+        if(best != current):
+            partOf[routerID] = best
+            sizes[current] -= 1
+            sizes[best] += 1
+    return partOf
+
+# builds the routers for the given ids, with RemoteRouter for every other router
+def buildPartition(numRouters, edges, maxQueueSizes, localIDs, config = None):
+    routers = [None] * numRouters
+    for i in localIDs:
+        routers[i] = Router(i, numRouters, config)
+        if(maxQueueSizes != None and maxQueueSizes[i] != -1):
+            routers[i].maxQueueSize = maxQueueSizes[i]
+    for i in range(numRouters):
+        if(routers[i] == None):
+            routers[i] = RemoteRouter(i)
+
+    # same connection order as main.createMutualConnection over the edge list
+    for idA, idB, bandwidth in edges:
+        if(isinstance(routers[idA], Router)):
+            routers[idA].createConnection(routers[idB], bandwidth, 0)
+        if(isinstance(routers[idB], Router)):
+            routers[idB].createConnection(routers[idA], bandwidth, 0)
+    return routers
+
+# state of one router that the two simulations are compared on
+def getRouterState(router):
+    connections = []
+    for connection in router.connections:
+        connections.append((connection.other.routerID, connection.cost, connection.throughputPercent, connection.throttlePercent))
+    queued = [packet.toRecord() for packet in router.queuedPackets]
+    current = None if router.currentPacket == None else router.currentPacket.toRecord()
+    return (router.routerID, router.routeCost.tobytes(), router.routeNextHop.tobytes(), connections, queued,
+            current, router.currentPacketProg, router.timeSinceBroadcast, router.packetsForwarded)
+
+# sorts outbox entries into delivery order. the sort is stable, so packets from one
+# sender keep the order they were sent in
+def sortOutbox(outbox):
+    outbox.sort(key=lambda entry: entry[1])
+
+# delivers (destID, senderID, packet) entries to local routers
+def deliverPackets(routers, entries):
+    for destID, senderID, packet in entries:
+        routers[destID].queuePacket(packet, routers[senderID])
+
+# single process barrier simulation, the reference for ParallelSimulation
+class BarrierSimulation:
+    def __init__(self, routers):
+        self.routers = routers
+        self.outbox = [] # packets waiting for the next barrier
+        for router in routers:
+            router.outbox = self.outbox
+
+    # runs the simulation for timeToRun steps starting at time
+    def run(self, timeToRun, time):
+        for i in range(timeToRun):
+            self.flush()
+            for router in self.routers:
+                router.timeTick(time)
+            time = time + 1
+
+    # delivers everything sent since the last barrier
+    def flush(self):
+        entries = list(self.outbox)
+        self.outbox.clear()
+        sortOutbox(entries)
+        deliverPackets(self.routers, entries)
+
+    # queues a packet at its source router at the next barrier, like
+    # source.queuePacket(packet, source)
+    def inject(self, packet):
+        self.outbox.append((packet.getSourceID(), packet.getSourceID(), packet))
+
+    def getRouterStates(self):
+        return [getRouterState(router) for router in self.routers]
+
+# worker process loop for ParallelSimulation. packets between local routers are kept
+# for the next barrier and merged with the ones the parent passes on from other
+# partitions; every sender's packets come from one of the two, so sorting the merge
+# gives the same order as sorting the whole outbox
+def runPartitionWorker(connection, numRouters, edges, maxQueueSizes, localIDs, config):
+    routers = buildPartition(numRouters, edges, maxQueueSizes, localIDs, config)
+    local = [routers[i] for i in localIDs]
+    isLocal = bytearray(numRouters)
+    for i in localIDs:
+        isLocal[i] = 1
+    outbox = []
+    for router in local:
+        router.outbox = outbox
+    pending = [] # packets between local routers waiting for the next barrier
+
+    while(True):
+        command = connection.recv()
+        if(command[0] == "tick" or command[0] == "flush"):
+            entries = pending
+            for destID, senderID, record in command[2]:
+                entries.append((destID, senderID, Packet.fromRecord(record, routers)))
+            sortOutbox(entries)
+            deliverPackets(routers, entries)
+            if(command[0] == "tick"):
+                for router in local:
+                    router.timeTick(command[1])
+            pending = []
+            remote = []
+            for entry in outbox:
+                if(isLocal[entry[0]]):
+                    pending.append(entry)
+                else:
+                    remote.append((entry[0], entry[1], entry[2].toRecord()))
+            outbox.clear()
+            connection.send(remote)
+        elif(command[0] == "state"):
+            connection.send([getRouterState(router) for router in local])
+        elif(command[0] == "stop"):
+            connection.close()
+            return
+
+# simulation split across worker processes. routers live in the workers, so the
+# network is built from its description: edges as (idA, idB, bandwidth) and optional
+# per router maxQueueSizes (-1 for the default)
+class ParallelSimulation:
+    def __init__(self, numRouters, edges, maxQueueSizes = None, numWorkers = None, config = None):
+        if(numWorkers == None):
+            numWorkers = multiprocessing.cpu_count()
+        numWorkers = max(1, min(numWorkers, numRouters))
+        self.numRouters = numRouters
+        self.partOf = partitionRouters(numRouters, edges, numWorkers)
+        self.outbox = [] # (destID, senderID, packetRecord) waiting for the next barrier
+
+        self.connections = []
+        self.workers = []
+        for part in range(numWorkers):
+            localIDs = [i for i in range(numRouters) if self.partOf[i] == part]
+            parentEnd, workerEnd = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=runPartitionWorker, args=(workerEnd, numRouters, edges, maxQueueSizes, localIDs, config), daemon=True)
+            worker.start()
+            workerEnd.close()
+            self.connections.append(parentEnd)
+            self.workers.append(worker)
+
+    # sends a command to every worker with its share of the outbox, and gathers the
+    # packets they sent to other partitions in return as the next outbox
+    def barrier(self, command, time):
+        sortOutbox(self.outbox)
+        inboxes = [[] for i in range(len(self.connections))]
+        for entry in self.outbox:
+            inboxes[self.partOf[entry[0]]].append(entry)
+        for part in range(len(self.connections)):
+            self.connections[part].send((command, time, inboxes[part]))
+        self.outbox = []
+        for connection in self.connections:
+            self.outbox.extend(connection.recv())
+
+    # runs the simulation for timeToRun steps starting at time
+    def run(self, timeToRun, time):
+        for i in range(timeToRun):
+            self.barrier("tick", time)
+            time = time + 1
+
+    # delivers everything sent since the last barrier
+    def flush(self):
+        self.barrier("flush", 0)
+
+    # queues a packet at its source router at the next barrier. the packet's routers
+    # are only used for their ids
+    def inject(self, packet):
+        self.outbox.append((packet.getSourceID(), packet.getSourceID(), packet.toRecord()))
+
+    def getRouterStates(self):
+        states = []
+        for connection in self.connections:
+            connection.send(("state",))
+        for connection in self.connections:
+            states.extend(connection.recv())
+        states.sort(key=lambda state: state[0])
+        return states
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(("stop",))
+            connection.close()
+        for worker in self.workers:
+            worker.join()
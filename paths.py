@@ -0,0 +1,241 @@
+import heapq
+from array import array
+from router import *
+
+# Path queries. reconstructs the hop by hop path and total cost a data packet would take
+# between routers straight from the forwarding tables, without sending trace packets
+# or ticking the simulation. the cost is the sum of the Connection.cost of every link on
+# the path, the same as a trace packet adds up, and can be compared with the routing
+# table's own cost for the route and with the true shortest path over the current
+# connection costs.
+#
+# paths are worked out a destination at a time: the next hops towards one destination
+# form a tree (or not, when routing is broken), so every source's path is the first hop
+# plus the next router's path and each router is walked once per destination. results
+# are kept until a routing table or connection cost changes, checked through a version
+# vector of every router's tableVersion and routeChanges plus the connection costs.
+#
+#   query = PathQuery(routers)
+#   query.getPath(0, 15).path         # [0, 1, 2, ..., 15]
+#   query.comparePaths()["optimal"]   # routes as cheap as the shortest path, over all pairs
+
+PATH_OK = 0 # reaches the destination
+PATH_LOOP = 1 # goes around a forwarding loop forever
+PATH_BLACK_HOLE = 2 # reaches a router without a route to the destination, where it's dropped
+PATH_STATUS_NAMES = {PATH_OK: "ok", PATH_LOOP: "loop", PATH_BLACK_HOLE: "black_hole"}
+PATH_COST_TOLERANCE = 1e-9 # relative difference under which two costs are the same
+
+# where a packet from sourceID to destinationID goes. for a loop the path ends with the
+# first router that repeats, for a black hole with the router that has no route. cost is
+# the cost of the links on the path, advertisedCost the source's routeCost for the
+# destination
+class PathResult:
+    __slots__ = ("sourceID", "destinationID", "status", "path", "cost", "advertisedCost")
+
+    def __init__(self, sourceID, destinationID, status, path, cost, advertisedCost):
+        self.sourceID = sourceID
+        self.destinationID = destinationID
+        self.status = status
+        self.path = path
+        self.cost = cost
+        self.advertisedCost = advertisedCost
+
+    @property
+    def hops(self):
+        return len(self.path) - 1
+
+    def __repr__(self):
+        return ("PathResult(" + str(self.sourceID) + " -> " + str(self.destinationID) + ", " + PATH_STATUS_NAMES[self.status]
+                + ", " + str(self.path) + ", cost " + str(self.cost) + ")")
+
+# every source's path towards one destination: status, cost and next hop per router
+class DestinationPaths:
+    __slots__ = ("destinationID", "status", "cost", "nextHop")
+
+    def __init__(self, numRouters, destinationID):
+        self.destinationID = destinationID
+        self.status = bytearray(numRouters)
+        self.cost = array("d", [0]) * numRouters
+        self.nextHop = array("i", [-1]) * numRouters
+
+class PathQuery:
+    def __init__(self, routers):
+        self.routers = routers
+        self.version = None # version vector the cached results were worked out at
+        self.linkVersion = None # connection costs the cached shortest paths were worked out at
+        self.destinations = {} # destinationID -> DestinationPaths
+        self.shortest = {} # sourceID -> array of shortest path costs
+
+    # returns the PathResult from sourceID to destinationID. checking for changes is
+    # linear in the network size, use getPaths for many pairs
+    def getPath(self, sourceID, destinationID):
+        self.checkVersion()
+        return self.makeResult(sourceID, destinationID)
+
+    # returns a PathResult for each (sourceID, destinationID) pair, all pairs if None
+    def getPaths(self, pairs = None):
+        self.checkVersion()
+        return [self.makeResult(sourceID, destinationID) for sourceID, destinationID in self.iterPairs(pairs)]
+
+    # returns the true shortest path cost from sourceID to every router over the current
+    # connection costs, ROUTER_NO_ROUTE_COST where there's no path
+    def getShortestCosts(self, sourceID):
+        self.checkVersion()
+        return self.getSourceShortestCosts(sourceID)
+
+    def getSourceShortestCosts(self, sourceID):
+        costs = self.shortest.get(sourceID)
+        if(costs == None):
+            costs = self.findShortestCosts(sourceID)
+            self.shortest[sourceID] = costs
+        return costs
+
+    # summary of route quality over the given pairs (all pairs if None): how many paths
+    # are ok, loop or end in a black hole, how many ok paths are as cheap as the shortest
+    # path, how much more they cost (stretch, path cost over shortest cost), and how many
+    # routes have a routing table cost different from what their path really costs
+    def comparePaths(self, pairs = None):
+        self.checkVersion()
+        summary = {"pairs": 0, "ok": 0, "loops": 0, "black_holes": 0, "unreachable": 0, "optimal": 0,
+                   "mean_stretch": 1.0, "max_stretch": 1.0, "worst_pair": None, "cost_mismatches": 0}
+        stretchTotal = 0
+        stretchCount = 0
+        for sourceID, destinationID in self.iterPairs(pairs):
+            summary["pairs"] += 1
+            shortest = self.getSourceShortestCosts(sourceID)[destinationID]
+            if(shortest >= ROUTER_NO_ROUTE_COST):
+                summary["unreachable"] += 1
+                continue
+            paths = self.getDestinationPaths(destinationID)
+            status = paths.status[sourceID]
+            if(status == PATH_LOOP):
+                summary["loops"] += 1
+                continue
+            if(status == PATH_BLACK_HOLE):
+                summary["black_holes"] += 1
+                continue
+
+            summary["ok"] += 1
+            cost = paths.cost[sourceID]
+            if(not isSameCost(cost, self.routers[sourceID].routeCost[destinationID])):
+                summary["cost_mismatches"] += 1
+            optimal = cost <= shortest or isSameCost(cost, shortest)
+            if(optimal):
+                summary["optimal"] += 1
+            if(shortest > 0):
+                stretch = 1.0 if optimal else cost / shortest
+                stretchTotal += stretch
+                stretchCount += 1
+                if(stretch > summary["max_stretch"]):
+                    summary["max_stretch"] = stretch
+                    summary["worst_pair"] = (sourceID, destinationID)
+        if(stretchCount != 0):
+            summary["mean_stretch"] = stretchTotal / stretchCount
+        return summary
+
+    def iterPairs(self, pairs):
+        if(pairs != None):
+            return pairs
+        numRouters = len(self.routers)
+        return ((sourceID, destinationID) for destinationID in range(numRouters) for sourceID in range(numRouters))
+
+    # drops the cached results if any routing table or connection cost changed since they
+    # were worked out
+    def checkVersion(self):
+        linkVersion = tuple(connection.cost for router in self.routers for connection in router.connections)
+        version = (tuple((router.tableVersion, router.routeChanges) for router in self.routers), linkVersion)
+        if(version != self.version):
+            self.version = version
+            self.destinations.clear()
+        if(linkVersion != self.linkVersion):
+            self.linkVersion = linkVersion
+            self.shortest.clear()
+
+    def makeResult(self, sourceID, destinationID):
+        paths = self.getDestinationPaths(destinationID)
+        path = [sourceID]
+        seen = {sourceID}
+        routerID = sourceID
+        while(paths.nextHop[routerID] != -1):
+            routerID = paths.nextHop[routerID]
+            path.append(routerID)
+            if(routerID in seen): # around a loop once
+                break
+            seen.add(routerID)
+        return PathResult(sourceID, destinationID, paths.status[sourceID], path, paths.cost[sourceID],
+                          self.routers[sourceID].routeCost[destinationID])
+
+    def getDestinationPaths(self, destinationID):
+        paths = self.destinations.get(destinationID)
+        if(paths == None):
+            paths = self.findDestinationPaths(destinationID)
+            self.destinations[destinationID] = paths
+        return paths
+
+    # follows every router's forwarding table towards destinationID. each walk stops at
+    # the destination, a router without a route, a router already worked out, or a router
+    # already on the walk (a loop), then the result is passed back down the walk
+    def findDestinationPaths(self, destinationID):
+        routers = self.routers
+        numRouters = len(routers)
+        paths = DestinationPaths(numRouters, destinationID)
+        nextHop = paths.nextHop
+        linkCost = array("d", [0]) * numRouters
+        for router in routers:
+            cID = router.forwardingTable[destinationID]
+            if(cID != -1 and router.routerID != destinationID):
+                connection = router.connections[cID]
+                nextHop[router.routerID] = connection.other.routerID
+                linkCost[router.routerID] = connection.cost
+
+        done = bytearray(numRouters)
+        onWalk = bytearray(numRouters)
+        done[destinationID] = 1
+        for sourceID in range(numRouters):
+            walk = []
+            routerID = sourceID
+            while(not done[routerID] and not onWalk[routerID] and nextHop[routerID] != -1):
+                onWalk[routerID] = 1
+                walk.append(routerID)
+                routerID = nextHop[routerID]
+
+            if(done[routerID]):
+                status = paths.status[routerID]
+                cost = paths.cost[routerID]
+            elif(onWalk[routerID]):
+                status = PATH_LOOP
+                cost = ROUTER_NO_ROUTE_COST
+            else:
+                # no route here
+                status = PATH_BLACK_HOLE
+                cost = 0
+                paths.status[routerID] = status
+                done[routerID] = 1
+            for walkID in reversed(walk):
+                if(status != PATH_LOOP):
+                    cost += linkCost[walkID]
+                paths.status[walkID] = status
+                paths.cost[walkID] = cost
+                done[walkID] = 1
+                onWalk[walkID] = 0
+        return paths
+
+    # Dijkstra over the current connection costs
+    def findShortestCosts(self, sourceID):
+        costs = array("d", [ROUTER_NO_ROUTE_COST]) * len(self.routers)
+        costs[sourceID] = 0
+        heap = [(0, sourceID)]
+        while(len(heap) != 0):
+            cost, routerID = heapq.heappop(heap)
+            if(cost > costs[routerID]):
+                continue
+            for connection in self.routers[routerID].connections:
+                otherID = connection.other.routerID
+                newCost = cost + connection.cost
+                if(newCost < costs[otherID]):
+                    costs[otherID] = newCost
+                    heapq.heappush(heap, (newCost, otherID))
+        return costs
+
+def isSameCost(costA, costB):
+    return abs(costA - costB) <= PATH_COST_TOLERANCE * max(1, abs(costA), abs(costB))
@@ -0,0 +1,100 @@
+import time as clock
+
+# Phase profiler for Router.timeTick. routers report to it through Router.profiler,
+# which is None by default; timeTick checks it once per tick and runs its phases through
+# timePhase when it's set, so the untimed simulation does no timing work.
+#
+# times are exclusive: a phase that triggers another one (a broadcast delivering routing
+# packets that neighbors process on arrival, or the scheduler ticking a router to catch
+# it up) isn't charged for the nested phase, so all phase times add up to the time spent
+# in the simulation.
+
+PHASE_BROADCAST = "broadcast" # broadcast decision and broadcastRoutingInfo, or tickLinkState
+PHASE_THROTTLE_DECAY = "throttle_decay" # checkConnectionThrottles
+PHASE_DEQUEUE = "dequeue" # taking the next packet off the queue and routing it
+PHASE_LINK = "link" # link progress and sending finished packets on
+META_PHASES = {1: "meta_routing_info", 2: "meta_trace", 3: "meta_throttle", 4: "meta_link_state"} # processPacketMeta by meta type
+
+# whether each phase is routing work or forwarding work
+PHASE_CATEGORIES = {
+    PHASE_BROADCAST: "routing",
+    PHASE_THROTTLE_DECAY: "routing",
+    PHASE_DEQUEUE: "forwarding",
+    PHASE_LINK: "forwarding",
+    "meta_routing_info": "routing",
+    "meta_trace": "forwarding",
+    "meta_throttle": "routing",
+    "meta_link_state": "routing",
+}
+
+class PhaseProfiler:
+    def __init__(self):
+        self.times = {} # phase -> exclusive seconds
+        self.calls = {} # phase -> times entered
+        self.nested = [] # time spent in nested phases, per phase being timed
+
+    # makes the routers report to this
+    def attach(self, routers):
+        for router in routers:
+            router.profiler = self
+
+    # starts timing a phase, returns the start time to pass to exit
+    def enter(self):
+        self.nested.append(0.0)
+        return clock.perf_counter()
+
+    # stops timing a phase started with enter
+    def exit(self, phase, start):
+        elapsed = clock.perf_counter() - start
+        self.times[phase] = self.times.get(phase, 0.0) + elapsed - self.nested.pop()
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        if(len(self.nested) != 0):
+            self.nested[-1] += elapsed
+
+    # runs function(*args) timed as the given phase, returns what it returns
+    def timePhase(self, phase, function, *args):
+        start = self.enter()
+        result = function(*args)
+        self.exit(phase, start)
+        return result
+
+    # phase name for processing a meta packet of the given type
+    def getMetaPhase(metaType):
+        return META_PHASES.get(metaType, "meta_" + str(metaType))
+
+    def getTotalTime(self):
+        return sum(self.times.values())
+
+    # seconds spent per category of PHASE_CATEGORIES
+    def getCategoryTimes(self):
+        categories = {}
+        for phase in self.times:
+            category = PHASE_CATEGORIES.get(phase, "other")
+            categories[category] = categories.get(category, 0.0) + self.times[phase]
+        return categories
+
+    # [phase, category, calls, seconds, percent of total] rows, most time first
+    def getReport(self):
+        total = self.getTotalTime()
+        rows = []
+        for phase in sorted(self.times, key=lambda phase: -self.times[phase]):
+            percent = 100 * self.times[phase] / total if total != 0 else 0
+            rows.append([phase, PHASE_CATEGORIES.get(phase, "other"), self.calls[phase], self.times[phase], percent])
+        return rows
+
+    # hot spot report as text
+    def formatReport(self):
+        lines = ["phase                category     calls      seconds  mean us  percent"]
+        for phase, category, calls, seconds, percent in self.getReport():
+            lines.append(phase.ljust(21) + category.ljust(11) + str(calls).rjust(7) + ("%13.4f" % seconds)
+                         + ("%9.2f" % (1000000 * seconds / calls)) + ("%8.1f%%" % percent))
+        total = self.getTotalTime()
+        categories = self.getCategoryTimes()
+        for category in sorted(categories, key=lambda category: -categories[category]):
+            percent = 100 * categories[category] / total if total != 0 else 0
+            lines.append(category + ": " + ("%.4f" % categories[category]) + "s (" + ("%.1f" % percent) + "%)")
+        return "\n".join(lines)
+
+    def reset(self):
+        self.times.clear()
+        self.calls.clear()
@@ -1,412 +1,1144 @@
-import random
-import math
-
-ROUTER_MAX_PQUEUE_SIZE = 1
-ROUTER_PROC_DELAY = 1
-ROUTER_BROADCAST_FREQUENCY = 10
-ROUTER_INITIAL_BROADCAST_FREQUENCY = 1
-ROUTER_INTIALIZATION_TIME = 10
-ROUTER_THROUGHPUT_DECAY = 0.2
-ROUTER_THROUGHPUT_DECAY_FREQUENCY = 10
-
-# Router class representing a real router with connections, routing table, queueing, 
-# processing, etc.
-class Router:
-    def __init__(self, routerID, numRouters):
-        self.routerID = routerID
-        self.connections = [] # connection objects
-        self.routingTable = [] # [destID, cost, nextRouterObj]
-        self.queuedPackets = []
-        self.queueSize = 0
-        self.maxQueueSize = ROUTER_MAX_PQUEUE_SIZE
-        self.numRouters = numRouters
-        self.timeSinceBroadcast = 0
-
-        self.currentPacket = None
-        self.currentConnectionID = None
-        self.currentPacketProg = 0
-
-        # setup routing table defaults
-        # [id, distance, nextRouter]
-        for i in range(numRouters):
-            if i == self.routerID:
-                self.routingTable.append([i, 0, None])
-                continue
-
-            self.routingTable.append([i, 99999999, None])
-
-    # go through our routing table and check if we are using this connection for anything. 
-    # if we are, update the costs relative to the old cost so that we can optimize the
-    # connection potentially in the future
-    def updateConnectionRouting(self, connection, oldConnectionCost):
-        connectionRouterID = connection.other.routerID
-        difference = connection.cost - oldConnectionCost
-        for i in range(len(self.routingTable)):
-            entry = self.routingTable[i]
-            
-            if(entry[2] != None and entry[2].routerID == connectionRouterID):
-                # update the cost based on the difference
-                entry[1] += difference
-    
-    # should be ran every time we send out information to return to our
-    # normal throughput after failure
-    def checkConnectionThrottles(self):
-        for i in range(len(self.connections)):
-            connection = self.connections[i]
-            cID = self.connections.index(connection)
-            if(connection.throttlePercent != 1):
-                if(connection.throttlePercent >= 0.95):
-                    self.updateConnectionThrottle(cID, 1)
-                else:
-                    connection.throttlePercent += (1 - connection.throttlePercent) * ROUTER_THROUGHPUT_DECAY
-                    #print(connection.throttlePercent)
-
-    # update a connections throttle percentage
-    def updateConnectionThrottle(self, cID, percentage):
-        oldCost = self.connections[cID].cost
-        self.connections[cID].updateThrottlePercent(percentage)
-        self.updateConnectionRouting(self.connections[cID], oldCost)
-
-    # update a connections possible throughput percentage
-    def updateConnectionThroughput(self, cID, percentage):
-        oldCost = self.connections[cID].cost
-        self.connections[cID].updateThroughputPercent(percentage)
-        self.updateConnectionRouting(self.connections[cID], oldCost)
-
-    # forces all of the connections out of this router to fail, or be very slow
-    def forceRouterFailure(self):
-        for i in range(len(self.connections)):
-            self.updateConnectionThroughput(i, 0.01)
-    
-    # sets the router to full throughput
-    def forceFullThroughput(self):
-        for i in range(len(self.connections)):
-            self.updateConnectionThroughput(i, 1)
-        
-
-    # deconstructs packet's meta information and handles different types
-    def processPacketMeta(self, packet):
-        meta = packet.meta_info
-        if(meta != None):
-            meta_type = meta.meta_type
-
-            # broadcasted routing packet
-            # guaranteed to be a connected router
-            if(meta_type == 1):
-                otherRoutingTable = meta.meta_table[0]
-                otherRouterID = packet.source.routerID
-
-                # direct connection cost to determine if it's worth swapping our route
-                connection = self.getConnectionFromNextID(otherRouterID)
-                costToRouter = connection.cost
-
-                # loop through the packet's routing table to update our own
-                for i in range(len(otherRoutingTable)):
-                    if(otherRoutingTable[i][0] == self.routerID): # skip own entry in their table
-                        continue
-                    destID = otherRoutingTable[i][0]
-                    destCost = costToRouter + otherRoutingTable[i][1]
-
-                    currentRoutingCost = self.routingTable[destID][1]
-                    # we need to update cost for two cases:
-                    # 1: the cost is just better
-                    # 2: the update is from a path we're currently using for routing
-                    costBetter = destCost < currentRoutingCost
-                    costUpdate = (self.routingTable[destID][2] != None and otherRouterID == self.routingTable[destID][2].routerID)
-
-                    if(costBetter or costUpdate):
-                        self.timeSinceBroadcast = 1000
-                    
-                    if(costBetter): 
-                        self.updateRoutingTable(destID, destCost, packet.source)
-                    elif(costUpdate):
-                        # if we're making an update, we should try to get other routers to propagate this information relative to distance
-                        self.updateRoutingTable(destID, destCost, packet.source)
-
-            # tracing packet
-            if(meta_type == 2):
-                if(packet.getDestinationID() != self.routerID):
-                    nextRouterID = self.getNextRouterID(packet)
-                    connection = self.getConnectionFromNextID(nextRouterID)
-                    cost = connection.cost
-                    # add self to the packet meta's trace list and cost of next path
-                    packet.meta_info.meta_table[0].append(self.routerID)
-                    packet.meta_info.meta_table[1] += cost
-                else:
-                    trace_table = packet.meta_info.meta_table[0]
-                    trace_table.append(self.routerID)
-                    # print out trace stack
-                    Packet_META.PrintRoutingTrace(packet)
-            
-            # throttle packet
-            if(meta_type == 3):
-                if(packet.getDestinationID() == self.routerID):
-                    throttlePercent = packet.meta_info.meta_table[0]
-                    connection = self.getConnectionFromNextID(packet.getSourceID())
-                    cID = self.connections.index(connection)
-                    self.updateConnectionThrottle(cID, connection.throttlePercent * throttlePercent)
-                    
-                
-
-    # broadcasts information about our routing information to connections
-    def broadcastRoutingInfo(self):
-        for i in range(len(self.connections)):
-            newPacket = Packet_META_Crafter.RoutingInfoBroadcastPacket(self, self.connections[i].other, self.routingTable)
-            self.connections[i].other.queuePacket(newPacket, self)
-
-    # broadcasts a message to tell connections to lower the throughput to this router
-    def broadcastRoutingFailure(self):
-        for i in range(len(self.connections)):
-            newPacket = Packet_META_Crafter.RoutingInfoThrottlePacket(self, self.connections[i].other, 0.5)
-            self.connections[i].other.queuePacket(newPacket, self)
-
-    # sends message to one connection to lower throughput
-    def sendRoutingFailure(self, connection):
-        newPacket = Packet_META_Crafter.RoutingInfoThrottlePacket(self, connection.other, 0.5)
-        connection.other.queuePacket(newPacket, self)
-
-    # update routing table entry
-    def updateRoutingTable(self, id, newCost, newRouter):
-        self.routingTable[id][1] = newCost
-        self.routingTable[id][2] = newRouter
-
-    # add direct connection to connections table
-    def createConnection(self, other, throughput, failureRate):
-        newConnection = Connection(other, throughput, failureRate)
-        self.connections.append(newConnection)
-        currentRoutingCost = self.routingTable[other.routerID][1]
-        # update routing table if this route is better
-        if(newConnection.cost < currentRoutingCost):
-            self.updateRoutingTable(other.routerID, newConnection.cost, other)
-
-    # time tick; handles queueing, sending, etc. for a point in time
-    # also handles sending important information between routers
-    def timeTick(self, time):
-        # initialization
-        shouldBroadcast = False
-        if(time <= ROUTER_INTIALIZATION_TIME):
-            # send routing packets based on if initializing network
-            shouldBroadcast = self.timeSinceBroadcast >= ROUTER_INITIAL_BROADCAST_FREQUENCY
-        else:
-            shouldBroadcast = self.timeSinceBroadcast >= math.ceil(ROUTER_BROADCAST_FREQUENCY)
-        
-        # send routing table to connections if we should
-        if (shouldBroadcast):
-            self.broadcastRoutingInfo()
-            self.timeSinceBroadcast = 0
-        else:
-            self.timeSinceBroadcast += 1
-
-        if(time % ROUTER_THROUGHPUT_DECAY_FREQUENCY == 0):
-            self.checkConnectionThrottles()
-
-        newPacket = False
-        # no packet in buffer, and we can get one
-        if(self.currentPacket == None and len(self.queuedPackets) != 0):
-            newPacket = True
-            self.currentPacket = self.queuedPackets.pop(0)
-            nextRouterID = self.getNextRouterID(self.currentPacket)
-            self.queueSize -= self.currentPacket.size
-
-            # couldn't find a route for this packet
-            if(nextRouterID == -1):
-                self.currentPacket = None
-                print("Packet drop: no route found")
-            else: # found route, set connection
-                self.currentConnectionID = nextRouterID
-                self.currentPacketProg = 0
-
-        if( (self.currentPacket != None and not newPacket) or (self.currentPacket != None and newPacket and len(self.queuedPackets) != 0) ): # packet in buffer, sending
-            nextRouterID = self.getNextRouterID(self.currentPacket)
-            connection = self.getConnectionFromNextID(nextRouterID)
-            throughput = connection.getThroughput()
-            self.currentPacketProg += throughput
-            # "send" packet to the next router to handle, get ready for next queued packet
-            if(self.currentPacketProg > self.currentPacket.size):
-                # process the meta if it's necessary
-                hasMeta = self.currentPacket.meta_info != None
-                if (hasMeta):
-                    if(self.currentPacket.meta_info.requires_inspection):
-                        self.processPacketMeta(self.currentPacket)
-
-                nextRouter = connection.other
-                nextRouter.queuePacket(self.currentPacket, self)
-                self.currentPacket = None
-
-    # adds packet to queue and queueSize if it can. drops packets if can't handle them
-    def queuePacket(self, packet, sender):
-        hasMeta = packet.meta_info != None
-        # packet recieved and it's ours
-        if (packet.destination == self):
-            #print("Packet received: FROM RID #" + str(packet.source.routerID) + " TO RID #" + str(packet.destination.routerID) + ". ISMETA: " + str(hasMeta))
-
-            self.processPacketMeta(packet)
-            return
-
-
-        packetSize = packet.size
-        if (self.queueSize + packetSize < self.maxQueueSize):
-            self.queuedPackets.append(packet)
-            self.queueSize += packetSize
-        else:
-            connection = self.getConnectionFromNextID(sender.routerID)
-            self.sendRoutingFailure(connection)
-            print("Packet drop: queue size exceeded at r" + str(self.routerID) + ". Throttling connection to r" + str(sender.routerID))
-
-    # returns the connection object for the given id
-    def getConnectionFromNextID(self, id):
-        for i in range(len(self.connections)):
-            if (self.connections[i].other.routerID == id):
-                return self.connections[i]
-        return None
-
-    # returns -1 if can't find a next router, otherwise
-    # returns the router ID for the next router
-    def getNextRouterID(self, packet):
-        packetDestID = packet.getDestinationID()
-        nextRouter = self.routingTable[packetDestID][2]
-        if(nextRouter == None):
-            return -1
-        else:
-            return nextRouter.routerID
-
-    # returns true if routing table has a route to ID
-    def doesRouteExist(self, id):
-        return self.routingTable[id][2] != None
-
-    # returns the value of the routing table's distance to ID
-    def getDistanceToRouterID(self, id):
-        return self.routingTable[id][1]
-    
-
-    
-# helper class to contain source/dest of a packet, as well as size, carried information,
-# and meta information for dynamic routing use
-class Packet:
-    def __init__(self, sourceRouter, destinationRouter, size, info, meta_info, isResponse):
-        self.information = info
-        self.meta_info = meta_info
-        self.size = size
-        self.destination = destinationRouter
-        self.source = sourceRouter
-        self.isResponse = isResponse
-
-    def getSourceID(self):
-        return self.source.routerID
-    
-    def getDestinationID(self):
-        return self.destination.routerID
-
-class Packet_META_Crafter:
-    # see PACKET_META for packet information
-    ROUTING_INFO_SIZE = 2
-
-    # returns a crafted packet with meta information for a routing table information request
-    # need to include a path cost if this is a response
-    def RoutingInfoPacket(sourceRouter, destRouter, routingID, isResponse, pathCost = -1):
-        meta_table = []
-        if(not isResponse):
-            meta_table = [routingID]
-        else:
-            if(pathCost == -1):
-                print("Fatal Error crafting routing packet: no path cost provided")
-                return None
-            meta_table = [routingID, pathCost]
-        
-        packet_meta = Packet_META(0, meta_table, False)
-        newPacket = Packet(sourceRouter, destRouter, Packet_META_Crafter.ROUTING_INFO_SIZE, None, packet_meta, isResponse)
-        return newPacket
-
-    # returns a crafted packet with meta information for a broadcasted routing table entry
-    def RoutingInfoBroadcastPacket(sourceRouter, destRouter, routingTable):
-        meta_table = [routingTable]
-        
-        packet_meta = Packet_META(1, meta_table, False)
-        newPacket = Packet(sourceRouter, destRouter, Packet_META_Crafter.ROUTING_INFO_SIZE + len(meta_table), None, packet_meta, True)
-        return newPacket
-
-    # returns a crafted packet with meta information for a tracing packet
-    # should add every router's distance to it on transmission
-    def RoutingInfoTracePacket(sourceRouter, destRouter):
-        meta_table = [ [], 0 ]
-        
-        packet_meta = Packet_META(2, meta_table, True)
-        newPacket = Packet(sourceRouter, destRouter, Packet_META_Crafter.ROUTING_INFO_SIZE + len(meta_table), None, packet_meta, True)
-        return newPacket
-
-    # returns a crafted packet with meta information for a throttle packet
-    def RoutingInfoThrottlePacket(sourceRouter, destRouter, percentage):
-        meta_table = [percentage]
-        
-        packet_meta = Packet_META(3, meta_table, False)
-        newPacket = Packet(sourceRouter, destRouter, Packet_META_Crafter.ROUTING_INFO_SIZE + len(meta_table), None, packet_meta, True)
-        return newPacket
-
-class Packet_META:
-    # meta_types:
-    # comments give meta_type as an ID number, the information they are supposed to represent,
-    # and below them is the data that goes in the meta_table. 
-    #
-    # 0 --> routing information request/response for routing table
-    #       REQUEST:  [routerID]
-    #       RESPONSE: [routerID, cost]
-    # 1 --> routing information broadcast for routing table
-    #       REQUEST:  unused
-    #       RESPONSE: [routingTable]
-    # 2 --> routing trace packet
-    #       REQUEST:  unused
-    #       RESPONSE: [ [r1, r2, r3, ...], [totalCost] ] list of routers traversed, and a cumulative cost
-    # 3 --> throttle packet
-    #       REQUEST: unused
-    #       RESPONSE: [percentage] percent to set connection throughput to between these two routers
-    def __init__(self, meta_type, meta_table, requires_inspection):
-        self.meta_type = meta_type
-        self.meta_table = meta_table
-        self.requires_inspection = requires_inspection # indicates that every router must evaluate this packet
-
-    def PrintRoutingTrace(packet):
-        trace_table = packet.meta_info.meta_table[0]
-        total_cost = str(packet.meta_info.meta_table[1])
-        trace = ""
-        sourceID = packet.getSourceID()
-        destID = packet.getDestinationID()
-        trace += "Routing Trace Packet from r" + str(sourceID) + " to r" + str(destID) + "\n";
-        trace += "Routing Trace Stack: "
-        # print out trace stack
-        for i in range(len(trace_table)):
-            trace += "r" + str(trace_table[i])
-            if(i != len(trace_table) - 1):
-                trace += " -> "
-        trace += ", cost: " + str(total_cost)
-        print(trace)
-
-
-
-# helper class to define the properties of a connection between two routers
-class Connection:
-    def __init__(self, otherRouter, throughput, failureRate):
-        self.other = otherRouter
-        self.throughput = throughput
-        self.failureRate = failureRate
-        self.cost = 100 * 1/throughput
-        self.throughputPercent = 1
-        self.throttlePercent = 1
-
-    def updateThroughputPercent(self, percent):
-        self.throughputPercent = percent
-        self.cost = 100 * 1 / (self.throughput * self.throughputPercent * self.throttlePercent)
-
-    def updateThrottlePercent(self, percent):
-        self.throttlePercent = percent
-        self.cost = 100 * 1 / (self.throughput * self.throughputPercent * self.throttlePercent)
-
-    def getThroughput(self):
-        return self.throughput * self.throughputPercent * self.throttlePercent
-
-    def getThroughputPercent(self):
-        return self.throughputPercent
-
-    def connectionSuccess(self):
-        success = random.random() > self.failureRate
-        return success
-
+import random
+import math
+import sys
+import heapq
+from array import array
+from collections import deque
+from metrics import *
+from profiler import *
+
+ROUTER_MAX_PQUEUE_SIZE = 1
+ROUTER_PROC_DELAY = 1
+ROUTER_BROADCAST_FREQUENCY = 10
+ROUTER_INITIAL_BROADCAST_FREQUENCY = 1
+ROUTER_INTIALIZATION_TIME = 10
+ROUTER_THROUGHPUT_DECAY = 0.2
+ROUTER_THROUGHPUT_DECAY_FREQUENCY = 10
+ROUTER_DELTA_BROADCAST = False # only broadcast routing entries changed since the last broadcast
+ROUTER_FULL_REFRESH_FREQUENCY = 5 # in delta mode, every nth broadcast sends the whole table
+ROUTER_NO_ROUTE_COST = 99999999
+ROUTER_CONTROL_QUEUE_SIZE = 50 # queue budget for meta packets, separate from maxQueueSize for data
+CONTROL_PACKET_POOL_SIZE = 4096 # most released control packets kept for reuse
+
+# routing modes
+ROUTING_DISTANCE_VECTOR = 0 # routers broadcast their routing tables to their neighbors
+ROUTING_LINK_STATE = 1 # routers flood the costs of their own connections and run Dijkstra
+ROUTER_ROUTING_MODE = ROUTING_DISTANCE_VECTOR
+
+# Per simulation behavior settings, so several differently configured simulations can
+# run in one process. defaults are the ROUTER_* constants above, read when the config is
+# created; keyword arguments override them, e.g. SimulationConfig(broadcastFrequency=5)
+class SimulationConfig:
+    def __init__(self, **settings):
+        self.maxQueueSize = ROUTER_MAX_PQUEUE_SIZE
+        self.controlQueueSize = ROUTER_CONTROL_QUEUE_SIZE
+        self.broadcastFrequency = ROUTER_BROADCAST_FREQUENCY
+        self.initialBroadcastFrequency = ROUTER_INITIAL_BROADCAST_FREQUENCY
+        self.initializationTime = ROUTER_INTIALIZATION_TIME
+        self.throughputDecay = ROUTER_THROUGHPUT_DECAY
+        self.throughputDecayFrequency = ROUTER_THROUGHPUT_DECAY_FREQUENCY
+        self.deltaBroadcast = ROUTER_DELTA_BROADCAST
+        self.fullRefreshFrequency = ROUTER_FULL_REFRESH_FREQUENCY
+        self.routingMode = ROUTER_ROUTING_MODE
+        for name in settings:
+            if(not hasattr(self, name)):
+                raise TypeError("unknown simulation setting: " + name)
+            setattr(self, name, settings[name])
+
+    # returns a copy with some settings changed
+    def copy(self, **settings):
+        values = dict(vars(self))
+        values.update(settings)
+        return SimulationConfig(**values)
+
+DEFAULT_SIMULATION_CONFIG = SimulationConfig()
+
+# queue drop policies
+QUEUE_DROP_TAIL = 0 # drop the arriving packet
+QUEUE_DROP_OLDEST = 1 # drop the oldest queued packets to make room for the arriving one
+QUEUE_STALE_META_TYPES = (1, 4) # meta_types a newer packet replaces, the only ones QUEUE_DROP_OLDEST drops
+
+# Router class representing a real router with connections, routing table, queueing, 
+# processing, etc.
+# the routing table is kept as two typed arrays indexed by destination id:
+# routeCost (float64) and routeNextHop (int32 router id, -1 if there's no route).
+# forwarding reads forwardingTable instead: the index in connections of the next hop for
+# each destination id (int32, -1 if there's no route), kept in step with routeNextHop by
+# updateRoutingTable
+#
+# in link state mode (config.routingMode) the routing table is a shortest path tree over
+# linkStateDatabase, the latest LinkStateAdvertisement from every router: spfParent holds
+# each destination's predecessor on its path (int32, -1 for none). see installLinkState
+class Router:
+    __slots__ = ("routerID", "config", "connections", "connectionIndex", "routeCost", "routeNextHop", "forwardingTable", "routesVia", "queuedPackets",
+                 "numRouters", "timeSinceBroadcast", "scheduler", "deltaBroadcast",
+                 "changedRoutes", "broadcastsSinceRefresh", "tableVersion", "advertisement", "advertisementVersion",
+                 "linkStateDatabase", "spfParent", "pendingFloods", "linkStateDirty", "linkStateSequence", "controlPacketsSent", "controlBytesSent",
+                 "decayCount", "throttledConnections", "packetsForwarded", "packetsDropped", "routeChanges", "metrics", "profiler", "convergence", "traffic", "outbox", "currentPacket",
+                 "currentConnectionID", "currentPacketProg")
+
+    def __init__(self, routerID, numRouters, config = None):
+        if(config == None):
+            config = DEFAULT_SIMULATION_CONFIG
+        self.routerID = routerID
+        self.config = config
+        self.connections = [] # connection objects
+        self.connectionIndex = {} # neighbor routerID -> index in connections
+        self.queuedPackets = PacketQueue(config.maxQueueSize, config.controlQueueSize)
+        self.numRouters = numRouters
+        self.timeSinceBroadcast = 0
+        self.decayCount = 0 # throughput decay boundaries passed, see Connection.getThrottleAt
+        self.throttledConnections = set() # indexes in connections of throttled connections
+        self.scheduler = None # event scheduler driving this router, if any
+        self.outbox = None # if set, packets sent to other routers are collected here for delivery at the tick barrier
+
+        self.deltaBroadcast = config.deltaBroadcast
+        self.changedRoutes = set() # destIDs changed since our last broadcast
+        self.broadcastsSinceRefresh = config.fullRefreshFrequency # first broadcast is a full one
+        self.tableVersion = 0 # bumped whenever routeCost changes
+        self.advertisement = None # full table advertisement, see getAdvertisement
+        self.advertisementVersion = -1 # tableVersion the advertisement was made at
+        self.linkStateDatabase = None # originID -> latest LinkStateAdvertisement, link state mode only
+        self.spfParent = None
+        self.pendingFloods = [] # (advertisement, routerID it came from) to flood on our next tick
+        self.linkStateDirty = False # our connection costs changed since our last advertisement
+        self.linkStateSequence = 0 # sequence number of our last advertisement
+        self.controlPacketsSent = 0 # routing packets, broadcasts or link state advertisements
+        self.controlBytesSent = 0
+        self.packetsForwarded = 0
+        self.packetsDropped = 0
+        self.routeChanges = 0 # number of routing table entries changed by updateRoutingTable
+        self.metrics = None # metrics.Metrics that counters and events are reported to, if any
+        self.profiler = None # profiler.PhaseProfiler timing the phases of timeTick, if any
+        self.convergence = None # convergence.ConvergenceDetector tracking routing changes and queued packets, if any
+        self.traffic = None # traffic.TrafficGenerator told about delivered and dropped data packets, if any
+
+        self.currentPacket = None
+        self.currentConnectionID = None
+        self.currentPacketProg = 0
+
+        # setup routing table defaults
+        self.routeCost = array("d", [ROUTER_NO_ROUTE_COST]) * numRouters
+        self.routeNextHop = array("i", [-1]) * numRouters
+        self.forwardingTable = array("i", [-1]) * numRouters
+        self.routeCost[self.routerID] = 0
+        self.routesVia = {} # neighbor routerID -> set of destIDs routed through it
+        if(config.routingMode == ROUTING_LINK_STATE):
+            self.linkStateDatabase = [None] * numRouters
+            self.spfParent = array("i", [-1]) * numRouters
+
+    # total size of all queued packets
+    @property
+    def queueSize(self):
+        return self.queuedPackets.getSize()
+
+    # queue budget for data packets
+    @property
+    def maxQueueSize(self):
+        return self.queuedPackets.maxSizes[PacketQueue.DATA]
+
+    @maxQueueSize.setter
+    def maxQueueSize(self, size):
+        self.queuedPackets.maxSizes[PacketQueue.DATA] = size
+
+    # routing table as [destID, cost, nextRouterObj] rows, built on request
+    @property
+    def routingTable(self):
+        table = []
+        for i in range(self.numRouters):
+            nextRouter = None
+            if(self.routeNextHop[i] != -1):
+                nextRouter = self.getConnectionFromNextID(self.routeNextHop[i]).other
+            table.append([i, self.routeCost[i], nextRouter])
+        return table
+
+    # go through our routing table and check if we are using this connection for anything. 
+    # if we are, update the costs relative to the old cost so that we can optimize the
+    # connection potentially in the future
+    def updateConnectionRouting(self, connection, oldConnectionCost):
+        difference = connection.cost - oldConnectionCost
+        if(self.linkStateDatabase != None):
+            # link state routes follow our advertisement instead, see tickLinkState
+            if(difference != 0):
+                self.linkStateDirty = True
+            return
+        for destID in self.routesVia[connection.other.routerID]:
+            # update the cost based on the difference
+            self.routeCost[destID] += difference
+            if(difference != 0):
+                self.changedRoutes.add(destID)
+                self.tableVersion += 1
+    
+    # should be ran every time we send out information to return to our
+    # normal throughput after failure. throttled connections close enough to full
+    # throughput snap back to it, the rest recover a step as decayCount goes up
+    def checkConnectionThrottles(self):
+        if(len(self.throttledConnections) != 0):
+            for cID in sorted(self.throttledConnections):
+                if(self.connections[cID].throttlePercent >= 0.95):
+                    self.updateConnectionThrottle(cID, 1)
+        self.decayCount += 1
+
+    # keeps throttledConnections in step with a connection's throttle
+    def trackThrottle(self, connection):
+        cID = self.connectionIndex.get(connection.other.routerID)
+        if(cID == None or self.connections[cID] is not connection):
+            return
+        if(connection.throttleStart != 1):
+            self.throttledConnections.add(cID)
+        else:
+            self.throttledConnections.discard(cID)
+
+    # update a connections throttle percentage
+    def updateConnectionThrottle(self, cID, percentage):
+        oldCost = self.connections[cID].cost
+        self.connections[cID].updateThrottlePercent(percentage)
+        self.updateConnectionRouting(self.connections[cID], oldCost)
+        if(self.metrics != None):
+            self.metrics.recordThrottle(self.routerID, self.connections[cID].other.routerID, percentage)
+
+    # update a connections possible throughput percentage
+    def updateConnectionThroughput(self, cID, percentage):
+        oldCost = self.connections[cID].cost
+        self.connections[cID].updateThroughputPercent(percentage)
+        self.updateConnectionRouting(self.connections[cID], oldCost)
+
+    # forces all of the connections out of this router to fail, or be very slow
+    def forceRouterFailure(self):
+        for i in range(len(self.connections)):
+            self.updateConnectionThroughput(i, 0.01)
+    
+    # sets the router to full throughput
+    def forceFullThroughput(self):
+        for i in range(len(self.connections)):
+            self.updateConnectionThroughput(i, 1)
+        
+
+    # deconstructs packet's meta information and handles different types
+    def processPacketMeta(self, packet):
+        if(self.profiler != None and packet.meta_info != None):
+            start = self.profiler.enter()
+            self.handlePacketMeta(packet)
+            self.profiler.exit(PhaseProfiler.getMetaPhase(packet.meta_info.meta_type), start)
+        else:
+            self.handlePacketMeta(packet)
+
+    def handlePacketMeta(self, packet):
+        meta = packet.meta_info
+        if(meta != None):
+            meta_type = meta.meta_type
+
+            # broadcasted routing packet
+            # guaranteed to be a connected router
+            if(meta_type == 1):
+                otherCosts = meta.meta_table[0]
+                otherDestIDs = meta.meta_table[1]
+                otherRouterID = packet.source.routerID
+
+                # direct connection cost to determine if it's worth swapping our route
+                connection = self.getConnectionFromNextID(otherRouterID)
+                costToRouter = connection.cost
+
+                # loop through the packet's routing table to update our own
+                for i in range(len(otherCosts)):
+                    destID = i if otherDestIDs == None else otherDestIDs[i]
+                    if(destID == self.routerID): # skip own entry in their table
+                        continue
+                    destCost = costToRouter + otherCosts[i]
+
+                    currentRoutingCost = self.routeCost[destID]
+                    # we need to update cost for two cases:
+                    # 1: the cost is just better
+                    # 2: the update is from a path we're currently using for routing
+                    costBetter = destCost < currentRoutingCost
+                    costUpdate = otherRouterID == self.routeNextHop[destID]
+
+                    if(costBetter or costUpdate):
+                        self.timeSinceBroadcast = 1000
+                    
+                    if(costBetter): 
+                        self.updateRoutingTable(destID, destCost, packet.source)
+                    elif(costUpdate):
+                        # if we're making an update, we should try to get other routers to propagate this information relative to distance
+                        self.updateRoutingTable(destID, destCost, packet.source)
+
+            # tracing packet
+            if(meta_type == 2):
+                if(packet.getDestinationID() != self.routerID):
+                    connection = self.connections[self.forwardingTable[packet.getDestinationID()]]
+                    cost = connection.cost
+                    # add self to the packet meta's trace list and cost of next path
+                    packet.meta_info.meta_table[0].append(self.routerID)
+                    packet.meta_info.meta_table[1] += cost
+                else:
+                    trace_table = packet.meta_info.meta_table[0]
+                    trace_table.append(self.routerID)
+                    if(self.metrics != None):
+                        self.metrics.recordTrace(packet.getSourceID(), self.routerID, trace_table, packet.meta_info.meta_table[1])
+                    else:
+                        # print out trace stack
+                        Packet_META.PrintRoutingTrace(packet)
+            
+            # throttle packet
+            if(meta_type == 3):
+                if(packet.getDestinationID() == self.routerID):
+                    throttlePercent = packet.meta_info.meta_table[0]
+                    cID = self.connectionIndex[packet.getSourceID()]
+                    connection = self.connections[cID]
+                    self.updateConnectionThrottle(cID, connection.throttlePercent * throttlePercent)
+
+            # link state advertisement, flooded on unless we already have it
+            if(meta_type == 4 and self.linkStateDatabase != None):
+                advertisement = meta.meta_table[0]
+                current = self.linkStateDatabase[advertisement.originID]
+                if(advertisement.originID != self.routerID and (current == None or advertisement.sequence > current.sequence)):
+                    self.installLinkState(advertisement)
+                    self.pendingFloods.append((advertisement, packet.source.routerID))
+                    
+                
+
+    # broadcasts information about our routing information to connections.
+    # in delta mode only the entries changed since the last broadcast are sent,
+    # with the whole table sent every fullRefreshFrequency broadcasts
+    def broadcastRoutingInfo(self):
+        advertisement = None
+        if(self.deltaBroadcast):
+            if(self.broadcastsSinceRefresh + 1 >= self.config.fullRefreshFrequency):
+                self.broadcastsSinceRefresh = 0
+            else:
+                self.broadcastsSinceRefresh += 1
+                if(len(self.changedRoutes) == 0):
+                    return
+                destIDs = array("i", sorted(self.changedRoutes))
+                advertisement = [array("d", [self.routeCost[id] for id in destIDs]), destIDs]
+        if(advertisement == None):
+            advertisement = self.getAdvertisement()
+        self.changedRoutes.clear()
+
+        for i in range(len(self.connections)):
+            newPacket = Packet_META_Crafter.RoutingInfoBroadcastPacket(self, self.connections[i].other, advertisement)
+            self.controlPacketsSent += 1
+            self.controlBytesSent += newPacket.size
+            self.sendPacket(self.connections[i].other, newPacket)
+
+    # returns the full routing table advertisement as of now, a [costs, destIDs] meta table
+    # holding a copy of routeCost. advertisements are never modified once made, so every
+    # packet carrying one can share it, and a new copy is only made after the table changed
+    def getAdvertisement(self):
+        if(self.advertisementVersion != self.tableVersion):
+            self.advertisement = [array("d", self.routeCost), None]
+            self.advertisementVersion = self.tableVersion
+        return self.advertisement
+
+    # link state phase of timeTick: advertises our connection costs if they changed, and
+    # floods the advertisements received since our last tick to every other neighbor, so
+    # an advertisement travels one hop per tick like a broadcast does
+    def tickLinkState(self):
+        if(self.linkStateDirty):
+            self.linkStateDirty = False
+            self.linkStateSequence += 1
+            costs = {}
+            for connection in self.connections:
+                costs[connection.other.routerID] = connection.cost
+            advertisement = LinkStateAdvertisement(self.routerID, self.linkStateSequence, costs)
+            self.installLinkState(advertisement)
+            self.pendingFloods.append((advertisement, -1))
+
+        if(len(self.pendingFloods) == 0):
+            return
+        floods = self.pendingFloods
+        self.pendingFloods = []
+        for advertisement, fromID in floods:
+            for connection in self.connections:
+                if(connection.other.routerID != fromID):
+                    newPacket = Packet_META_Crafter.LinkStatePacket(self, connection.other, advertisement)
+                    self.controlPacketsSent += 1
+                    self.controlBytesSent += newPacket.size
+                    self.sendPacket(connection.other, newPacket)
+
+    # replaces the advertisement of its origin in our link state database, and updates the
+    # shortest path tree for the links that changed
+    def installLinkState(self, advertisement):
+        originID = advertisement.originID
+        current = self.linkStateDatabase[originID]
+        self.linkStateDatabase[originID] = advertisement
+        oldCosts = {} if current == None else current.costs
+        increased = []
+        decreased = []
+        for otherID in advertisement.costs:
+            oldCost = oldCosts.get(otherID)
+            if(oldCost == None or advertisement.costs[otherID] < oldCost):
+                decreased.append(otherID)
+            elif(advertisement.costs[otherID] > oldCost):
+                increased.append(otherID)
+        for otherID in oldCosts:
+            if(otherID not in advertisement.costs):
+                increased.append(otherID)
+        if(len(increased) != 0 or len(decreased) != 0):
+            self.updateShortestPaths(originID, increased, decreased)
+
+    # incremental Dijkstra after the links from originID to the given routers changed cost.
+    # only the subtrees below links on the tree that got worse lose their paths; they're
+    # reconnected by their best link from the rest of the tree, and links that got better
+    # offer shorter paths to their ends. a heap based Dijkstra from just those routers then
+    # settles every route that changed, the rest of the table is left alone
+    def updateShortestPaths(self, originID, increased, decreased):
+        database = self.linkStateDatabase
+        parent = self.spfParent
+        routeCost = self.routeCost
+        cost = {} # new cost of every router whose path may change
+        heap = []
+
+        roots = [otherID for otherID in increased if parent[otherID] == originID]
+        affected = self.getShortestPathSubtrees(roots)
+        for id in affected:
+            cost[id] = ROUTER_NO_ROUTE_COST
+            parent[id] = -1
+        for id in affected:
+            for otherID in self.getLinkStateNeighbors(id):
+                if(otherID not in cost and routeCost[otherID] < ROUTER_NO_ROUTE_COST):
+                    newCost = routeCost[otherID] + database[otherID].costs[id]
+                    if(newCost < cost[id]):
+                        cost[id] = newCost
+                        parent[id] = otherID
+            if(cost[id] < ROUTER_NO_ROUTE_COST):
+                heapq.heappush(heap, (cost[id], id))
+
+        if(routeCost[originID] < ROUTER_NO_ROUTE_COST):
+            originCosts = database[originID].costs
+            for id in decreased:
+                newCost = routeCost[originID] + originCosts[id]
+                if(newCost < cost.get(id, routeCost[id])):
+                    cost[id] = newCost
+                    parent[id] = originID
+                    heapq.heappush(heap, (newCost, id))
+
+        settled = [] # in order, so a router's parent is settled before it
+        done = set()
+        while(len(heap) != 0):
+            pathCost, id = heapq.heappop(heap)
+            if(id in done or pathCost > cost[id]):
+                continue
+            done.add(id)
+            settled.append(id)
+            if(database[id] == None):
+                continue
+            costs = database[id].costs
+            for otherID in costs:
+                newCost = pathCost + costs[otherID]
+                if(newCost < cost.get(otherID, routeCost[otherID])):
+                    cost[otherID] = newCost
+                    parent[otherID] = id
+                    heapq.heappush(heap, (newCost, otherID))
+
+        # the next hop is the first router on the path, inherited down the tree
+        nextHops = {}
+        for id in settled:
+            parentID = parent[id]
+            nextHopID = id if parentID == self.routerID else nextHops.get(parentID, self.routeNextHop[parentID])
+            nextHops[id] = nextHopID
+            self.updateRoutingTable(id, cost[id], self.connections[self.connectionIndex[nextHopID]].other)
+        for id in affected:
+            if(id not in done):
+                self.updateRoutingTable(id, ROUTER_NO_ROUTE_COST, None)
+
+    # returns the routers in the shortest path subtrees below the given routers
+    def getShortestPathSubtrees(self, roots):
+        if(len(roots) == 0):
+            return []
+        parent = self.spfParent
+        inside = bytearray(self.numRouters) # 0 unknown, 1 in a subtree, 2 not
+        for id in roots:
+            inside[id] = 1
+        inside[self.routerID] = 2
+        for id in range(self.numRouters):
+            # walk up the tree until a router we know about, then mark the path with it
+            path = []
+            ancestorID = id
+            while(inside[ancestorID] == 0 and parent[ancestorID] != -1):
+                path.append(ancestorID)
+                ancestorID = parent[ancestorID]
+            if(inside[ancestorID] == 0):
+                inside[ancestorID] = 2
+            for pathID in path:
+                inside[pathID] = inside[ancestorID]
+        return [id for id in range(self.numRouters) if inside[id] == 1]
+
+    # routers with a link to id. links go both ways, so they're the ones in id's own
+    # advertisement, or the ones advertising a link to it until that arrives
+    def getLinkStateNeighbors(self, id):
+        database = self.linkStateDatabase
+        if(database[id] != None):
+            neighbors = database[id].costs
+        else:
+            neighbors = [otherID for otherID in range(self.numRouters) if database[otherID] != None]
+        return [otherID for otherID in neighbors if database[otherID] != None and id in database[otherID].costs]
+
+    # broadcasts a message to tell connections to lower the throughput to this router
+    def broadcastRoutingFailure(self):
+        for i in range(len(self.connections)):
+            newPacket = Packet_META_Crafter.RoutingInfoThrottlePacket(self, self.connections[i].other, 0.5)
+            self.sendPacket(self.connections[i].other, newPacket)
+
+    # sends message to one connection to lower throughput
+    def sendRoutingFailure(self, connection):
+        newPacket = Packet_META_Crafter.RoutingInfoThrottlePacket(self, connection.other, 0.5)
+        self.sendPacket(connection.other, newPacket)
+
+    # rebuilds the indexes and forwarding table derived from the routing table, for when
+    # routeCost/routeNextHop were written directly instead of through updateRoutingTable
+    def rebuildRoutingIndex(self):
+        self.tableVersion += 1
+        for neighborID in self.routesVia:
+            self.routesVia[neighborID].clear()
+        for i in range(self.numRouters):
+            if(self.routeNextHop[i] != -1):
+                self.routesVia[self.routeNextHop[i]].add(i)
+                self.forwardingTable[i] = self.connectionIndex[self.routeNextHop[i]]
+            else:
+                self.forwardingTable[i] = -1
+
+    # update routing table entry
+    def updateRoutingTable(self, id, newCost, newRouter):
+        newRouterID = -1 if newRouter == None else newRouter.routerID
+        oldRouterID = self.routeNextHop[id]
+        if(self.routeCost[id] != newCost):
+            self.tableVersion += 1
+        if(self.routeCost[id] != newCost or oldRouterID != newRouterID):
+            self.changedRoutes.add(id)
+            self.routeChanges += 1
+            if(self.metrics != None):
+                self.metrics.recordRouteChange(self.routerID, id, newRouterID, newCost)
+            if(self.convergence != None):
+                self.convergence.routeChanged()
+        if(oldRouterID != newRouterID):
+            if(oldRouterID != -1):
+                self.routesVia[oldRouterID].discard(id)
+            if(newRouterID != -1):
+                self.routesVia[newRouterID].add(id)
+                self.forwardingTable[id] = self.connectionIndex[newRouterID]
+            else:
+                self.forwardingTable[id] = -1
+        self.routeCost[id] = newCost
+        self.routeNextHop[id] = newRouterID
+
+    # add direct connection to connections table
+    def createConnection(self, other, throughput, failureRate):
+        newConnection = Connection(other, throughput, failureRate, self)
+        self.connectionIndex[other.routerID] = len(self.connections)
+        self.connections.append(newConnection)
+        if(other.routerID not in self.routesVia):
+            self.routesVia[other.routerID] = set()
+        if(self.linkStateDatabase != None):
+            self.linkStateDirty = True
+            return
+        currentRoutingCost = self.routeCost[other.routerID]
+        # update routing table if this route is better
+        if(newConnection.cost < currentRoutingCost):
+            self.updateRoutingTable(other.routerID, newConnection.cost, other)
+
+    # time tick; handles queueing, sending, etc. for a point in time
+    # also handles sending important information between routers
+    # with a profiler attached, the same phases are run through PhaseProfiler.timePhase
+    def timeTick(self, time):
+        metrics = self.metrics
+        if(metrics != None):
+            metrics.time = time
+        if(self.traffic != None):
+            self.traffic.time = time
+        decay = time % self.config.throughputDecayFrequency == 0
+        if(self.profiler == None):
+            self.tickBroadcast(time)
+            if(decay):
+                self.checkConnectionThrottles()
+            newPacket = self.tickDequeue()
+            sendingTo = self.tickLink(newPacket)
+        else:
+            timePhase = self.profiler.timePhase
+            timePhase(PHASE_BROADCAST, self.tickBroadcast, time)
+            if(decay):
+                timePhase(PHASE_THROTTLE_DECAY, self.checkConnectionThrottles)
+            newPacket = timePhase(PHASE_DEQUEUE, self.tickDequeue)
+            sendingTo = timePhase(PHASE_LINK, self.tickLink, newPacket)
+        if(metrics != None):
+            metrics.recordTick(self.routerID, len(self.queuedPackets), sendingTo)
+
+    # broadcast phase of timeTick: sends our routing table to connections when it's time
+    def tickBroadcast(self, time):
+        if(self.linkStateDatabase != None):
+            self.tickLinkState()
+            return
+        # initialization
+        config = self.config
+        shouldBroadcast = False
+        if(time <= config.initializationTime):
+            # send routing packets based on if initializing network
+            shouldBroadcast = self.timeSinceBroadcast >= config.initialBroadcastFrequency
+        else:
+            shouldBroadcast = self.timeSinceBroadcast >= math.ceil(config.broadcastFrequency)
+        
+        # send routing table to connections if we should
+        if (shouldBroadcast):
+            self.broadcastRoutingInfo()
+            self.timeSinceBroadcast = 0
+        else:
+            self.timeSinceBroadcast += 1
+
+    # dequeue phase of timeTick: takes the next packet when the link is free.
+    # returns true if a packet was taken
+    def tickDequeue(self):
+        newPacket = False
+        # no packet in buffer, and we can get one
+        if(self.currentPacket == None and len(self.queuedPackets) != 0):
+            newPacket = True
+            self.currentPacket = self.queuedPackets.pop()
+            cID = self.forwardingTable[self.currentPacket.getDestinationID()]
+
+            # couldn't find a route for this packet
+            if(cID == -1):
+                if(self.metrics != None):
+                    self.metrics.recordDrop(self.routerID, DROP_NO_ROUTE, self.currentPacket, -1)
+                if(self.traffic != None):
+                    self.traffic.packetDropped(self.currentPacket)
+                self.currentPacket = None
+                self.packetsDropped += 1
+                if(self.convergence != None):
+                    self.convergence.packetsHeld(-1)
+            else: # found route, set connection
+                self.currentConnectionID = self.connections[cID].other.routerID
+                self.currentPacketProg = 0
+        return newPacket
+
+    # link phase of timeTick: advances the current packet on its link and sends it on
+    # once it's through. returns the id of the router sent to this tick, -1 if none
+    def tickLink(self, newPacket):
+        sendingTo = -1
+        if( (self.currentPacket != None and not newPacket) or (self.currentPacket != None and newPacket and len(self.queuedPackets) != 0) ): # packet in buffer, sending
+            connection = self.connections[self.forwardingTable[self.currentPacket.getDestinationID()]]
+            throughput = connection.getThroughput()
+            self.currentPacketProg += throughput
+            sendingTo = connection.other.routerID
+            # "send" packet to the next router to handle, get ready for next queued packet
+            if(self.currentPacketProg > self.currentPacket.size):
+                # process the meta if it's necessary
+                hasMeta = self.currentPacket.meta_info != None
+                if (hasMeta):
+                    if(self.currentPacket.meta_info.requires_inspection):
+                        self.processPacketMeta(self.currentPacket)
+
+                nextRouter = connection.other
+                self.packetsForwarded += 1
+                if(self.metrics != None):
+                    self.metrics.recordForward(self.routerID)
+                self.sendPacket(nextRouter, self.currentPacket)
+                self.currentPacket = None
+                if(self.convergence != None):
+                    self.convergence.packetsHeld(-1)
+        return sendingTo
+
+    # returns the first time after the given (already ticked) time at which timeTick
+    # would do more than advance timers and link progress: a queued packet to pick up,
+    # the current packet finishing on its link, a broadcast, or a throttle decay
+    def nextActiveTime(self, time):
+        if(self.currentPacket == None and len(self.queuedPackets) != 0):
+            return time + 1
+
+        # broadcast timer, see shouldBroadcast in timeTick
+        config = self.config
+        if(self.linkStateDatabase != None):
+            # link state isn't timed, it only has work after a change
+            if(self.linkStateDirty or len(self.pendingFloods) != 0):
+                return time + 1
+            nextTime = sys.maxsize
+        else:
+            wait = max(1, config.initialBroadcastFrequency - self.timeSinceBroadcast + 1)
+            if(time + wait > config.initializationTime):
+                wait = max(1, math.ceil(config.broadcastFrequency) - self.timeSinceBroadcast + 1, config.initializationTime + 1 - time)
+            nextTime = time + wait
+
+        # throttled connections recover on their own between decay boundaries, the only
+        # one with anything to do is where a connection snaps back to full throughput
+        frequency = config.throughputDecayFrequency
+        if(len(self.throttledConnections) != 0):
+            firstBoundary = (time // frequency + 1) * frequency
+            for cID in self.throttledConnections:
+                steps = self.connections[cID].getRecoverySteps()
+                if(steps != -1):
+                    nextTime = min(nextTime, firstBoundary + steps * frequency)
+
+        # packet finishing on its link; progress is summed tick by tick like timeTick
+        # does so that the finishing tick matches exactly, with the link's throughput
+        # going up at each decay boundary if it's throttled
+        if(self.currentPacket != None):
+            cID = self.forwardingTable[self.currentPacket.getDestinationID()]
+            connection = self.connections[cID]
+            throttled = cID in self.throttledConnections
+            throughput = connection.getThroughput()
+            decayCount = self.decayCount
+            progress = self.currentPacketProg
+            for i in range(1, nextTime - time):
+                if(throttled and (time + i) % frequency == 0):
+                    decayCount += 1
+                    throughput = connection.getThroughputAt(decayCount)
+                progress += throughput
+                if(progress > self.currentPacket.size):
+                    return time + i
+
+        return nextTime
+
+    # applies count ticks that nextActiveTime found to have nothing to do, the last of
+    # them being time. decay boundaries in them only move decayCount along, the
+    # throttled connections work out their recovery from it when they're next read
+    def skipTicks(self, count, time):
+        if(self.linkStateDatabase == None):
+            self.timeSinceBroadcast += count
+        frequency = self.config.throughputDecayFrequency
+        sendingTo = -1
+        if(self.currentPacket != None):
+            cID = self.forwardingTable[self.currentPacket.getDestinationID()]
+            connection = self.connections[cID]
+            sendingTo = connection.other.routerID
+            throttled = cID in self.throttledConnections
+            throughput = connection.getThroughput()
+            for tick in range(time - count + 1, time + 1):
+                if(tick % frequency == 0):
+                    self.decayCount += 1
+                    if(throttled):
+                        throughput = connection.getThroughput()
+                self.currentPacketProg += throughput
+        else:
+            self.decayCount += time // frequency - (time - count) // frequency
+        if(self.metrics != None):
+            self.metrics.recordTick(self.routerID, len(self.queuedPackets), sendingTo, count)
+
+    # hands a packet to another router, or to the outbox if delivery is deferred to the tick barrier
+    def sendPacket(self, other, packet):
+        if(self.outbox == None):
+            other.queuePacket(packet, self)
+        else:
+            self.outbox.append((other.routerID, self.routerID, packet))
+
+    # adds packet to queue and queueSize if it can. drops packets if can't handle them
+    def queuePacket(self, packet, sender):
+        # let the scheduler catch us up before this packet changes our state
+        if(self.scheduler != None):
+            self.scheduler.wake(self)
+
+        hasMeta = packet.meta_info != None
+        # packet recieved and it's ours
+        if (packet.destination == self):
+            #print("Packet received: FROM RID #" + str(packet.source.routerID) + " TO RID #" + str(packet.destination.routerID) + ". ISMETA: " + str(hasMeta))
+
+            self.processPacketMeta(packet)
+            if(hasMeta):
+                CONTROL_PACKET_POOL.release(packet)
+            elif(self.traffic != None):
+                self.traffic.packetDelivered(packet)
+            return
+
+
+        dropped = self.queuedPackets.push(packet)
+        if(self.convergence != None):
+            self.convergence.packetsHeld(1 if dropped == None else 1 - len(dropped))
+        if (dropped != None):
+            self.packetsDropped += len(dropped)
+            # only the arriving packet came from sender, older ones dropped to make
+            # room for it came from wherever they came from
+            if(self.metrics != None):
+                for droppedPacket in dropped:
+                    self.metrics.recordDrop(self.routerID, DROP_QUEUE_FULL, droppedPacket, sender.routerID if droppedPacket is packet else -1)
+            if(self.traffic != None):
+                for droppedPacket in dropped:
+                    self.traffic.packetDropped(droppedPacket)
+            # sender is only throttled when it's the one whose packet didn't fit
+            connection = self.getConnectionFromNextID(sender.routerID)
+            if(connection != None and dropped[-1] is packet): # not injected locally
+                self.sendRoutingFailure(connection)
+
+    # returns the connection object for the given id
+    def getConnectionFromNextID(self, id):
+        cID = self.connectionIndex.get(id)
+        if(cID == None):
+            return None
+        return self.connections[cID]
+
+    # returns -1 if can't find a next router, otherwise
+    # returns the router ID for the next router
+    def getNextRouterID(self, packet):
+        return self.routeNextHop[packet.getDestinationID()]
+
+    # returns true if routing table has a route to ID
+    def doesRouteExist(self, id):
+        return self.routeNextHop[id] != -1
+
+    # returns the value of the routing table's distance to ID
+    def getDistanceToRouterID(self, id):
+        return self.routeCost[id]
+    
+
+    
+# Packet queue with one FIFO per priority class. control (meta) packets are always
+# dequeued before data packets, and each class has its own size budget and drop policy:
+# data packets are tail dropped, and control packets drop the oldest queued ones since
+# newer routing information replaces older. only routing information goes stale like
+# that (QUEUE_STALE_META_TYPES), other control packets like traces are tail dropped and
+# are never dropped to make room
+class PacketQueue:
+    __slots__ = ("queues", "sizes", "maxSizes", "dropPolicies")
+
+    # priority classes, in dequeue order
+    CONTROL = 0
+    DATA = 1
+
+    def __init__(self, maxDataSize, maxControlSize = ROUTER_CONTROL_QUEUE_SIZE):
+        self.queues = [deque(), deque()]
+        self.sizes = [0, 0]
+        self.maxSizes = [maxControlSize, maxDataSize]
+        self.dropPolicies = [QUEUE_DROP_OLDEST, QUEUE_DROP_TAIL]
+
+    def __len__(self):
+        return len(self.queues[0]) + len(self.queues[1])
+
+    # returns the priority class of a packet
+    def getPriority(packet):
+        if(packet.meta_info != None):
+            return PacketQueue.CONTROL
+        return PacketQueue.DATA
+
+    # total size of queued packets
+    def getSize(self):
+        return self.sizes[0] + self.sizes[1]
+
+    # queues the packet if its class has room. returns None if nothing was dropped,
+    # otherwise the list of dropped packets, which ends with the packet itself if it
+    # didn't fit (and is just the packet itself for tail drop)
+    def push(self, packet):
+        priority = PacketQueue.getPriority(packet)
+        queue = self.queues[priority]
+        maxSize = self.maxSizes[priority]
+        if(self.sizes[priority] + packet.size < maxSize):
+            queue.append(packet)
+            self.sizes[priority] += packet.size
+            return None
+
+        if(self.dropPolicies[priority] == QUEUE_DROP_TAIL or not PacketQueue.isStale(packet)):
+            return [packet]
+
+        # oldest stale packets first, as long as dropping them makes enough room
+        room = maxSize - self.sizes[priority] - packet.size
+        stale = []
+        for oldPacket in queue:
+            if(room > 0):
+                break
+            if(PacketQueue.isStale(oldPacket)):
+                stale.append(oldPacket)
+                room += oldPacket.size
+        if(room <= 0):
+            return [packet]
+
+        if(len(stale) == len(queue)):
+            queue.clear()
+        else:
+            dropIDs = set(id(oldPacket) for oldPacket in stale)
+            kept = [oldPacket for oldPacket in queue if id(oldPacket) not in dropIDs]
+            queue.clear()
+            queue.extend(kept)
+        for oldPacket in stale:
+            self.sizes[priority] -= oldPacket.size
+        queue.append(packet)
+        self.sizes[priority] += packet.size
+        return stale
+
+    # returns true if a newer packet of the same kind makes the packet useless
+    def isStale(packet):
+        return packet.meta_info != None and packet.meta_info.meta_type in QUEUE_STALE_META_TYPES
+
+    # removes and returns the next packet to send, highest priority first
+    def pop(self):
+        for priority in range(len(self.queues)):
+            queue = self.queues[priority]
+            if(len(queue) != 0):
+                packet = queue.popleft()
+                self.sizes[priority] -= packet.size
+                return packet
+        return None
+
+    # iterates over queued packets in dequeue order
+    def __iter__(self):
+        for queue in self.queues:
+            for packet in queue:
+                yield packet
+
+# helper class to contain source/dest of a packet, as well as size, carried information,
+# and meta information for dynamic routing use
+class Packet:
+    __slots__ = ("information", "meta_info", "size", "destination", "source", "isResponse")
+
+    def __init__(self, sourceRouter, destinationRouter, size, info, meta_info, isResponse):
+        self.information = info
+        self.meta_info = meta_info
+        self.size = size
+        self.destination = destinationRouter
+        self.source = sourceRouter
+        self.isResponse = isResponse
+
+    def getSourceID(self):
+        return self.source.routerID
+    
+    def getDestinationID(self):
+        return self.destination.routerID
+
+    # returns the packet as plain data with router ids in place of router objects,
+    # for sending between processes or saving
+    def toRecord(self):
+        meta = self.meta_info
+        if(meta == None):
+            metaRecord = None
+        else:
+            metaRecord = (meta.meta_type, meta.meta_table, meta.requires_inspection)
+        return (self.source.routerID, self.destination.routerID, self.size, self.information, metaRecord, self.isResponse)
+
+    # rebuilds a packet from toRecord, routers maps router ids to router objects
+    def fromRecord(record, routers):
+        sourceID, destinationID, size, information, metaRecord, isResponse = record
+        meta = None
+        if(metaRecord != None):
+            meta = Packet_META(metaRecord[0], metaRecord[1], metaRecord[2])
+        return Packet(routers[sourceID], routers[destinationID], size, information, meta, isResponse)
+
+# Free list of control packets. Packet_META_Crafter takes packets from it, and a router
+# puts a meta packet back once it's the destination and has processed it, so don't hold
+# on to a control packet after sending it. the meta_table isn't reused, only the Packet
+# and Packet_META objects around it
+class ControlPacketPool:
+    __slots__ = ("free", "maxSize", "created", "reused")
+
+    def __init__(self, maxSize = CONTROL_PACKET_POOL_SIZE):
+        self.free = []
+        self.maxSize = maxSize
+        self.created = 0
+        self.reused = 0
+
+    # returns a control packet with the given fields, reusing a released one if there is one
+    def acquire(self, sourceRouter, destRouter, size, meta_type, meta_table, requires_inspection, isResponse):
+        if(len(self.free) == 0):
+            self.created += 1
+            return Packet(sourceRouter, destRouter, size, None, Packet_META(meta_type, meta_table, requires_inspection), isResponse)
+
+        self.reused += 1
+        packet = self.free.pop()
+        packet.source = sourceRouter
+        packet.destination = destRouter
+        packet.size = size
+        packet.isResponse = isResponse
+        meta = packet.meta_info
+        meta.meta_type = meta_type
+        meta.meta_table = meta_table
+        meta.requires_inspection = requires_inspection
+        return packet
+
+    # takes back a meta packet that reached its destination
+    def release(self, packet):
+        if(len(self.free) < self.maxSize):
+            packet.source = None
+            packet.destination = None
+            packet.information = None
+            packet.meta_info.meta_table = None
+            self.free.append(packet)
+
+CONTROL_PACKET_POOL = ControlPacketPool()
+
+# the costs of one router's connections as of one point in time, flooded to every router
+# in link state mode. a newer sequence number replaces the advertisement in the database.
+# never modified once made, so every router and packet holding it can share it
+class LinkStateAdvertisement:
+    __slots__ = ("originID", "sequence", "costs")
+
+    def __init__(self, originID, sequence, costs):
+        self.originID = originID
+        self.sequence = sequence
+        self.costs = costs # neighbor routerID -> connection cost
+
+class Packet_META_Crafter:
+    # see PACKET_META for packet information
+    ROUTING_INFO_SIZE = 2
+    ROUTING_ENTRY_SIZE = 1 # size of each routing table entry carried by a broadcast
+
+    # returns a crafted packet with meta information for a routing table information request
+    # need to include a path cost if this is a response
+    def RoutingInfoPacket(sourceRouter, destRouter, routingID, isResponse, pathCost = -1):
+        meta_table = []
+        if(not isResponse):
+            meta_table = [routingID]
+        else:
+            if(pathCost == -1):
+                print("Fatal Error crafting routing packet: no path cost provided")
+                return None
+            meta_table = [routingID, pathCost]
+        
+        return CONTROL_PACKET_POOL.acquire(sourceRouter, destRouter, Packet_META_Crafter.ROUTING_INFO_SIZE, 0, meta_table, False, isResponse)
+
+    # returns a crafted packet with meta information for a broadcasted routing table.
+    # advertisement is the [costs, destIDs] meta table, shared by every packet of a broadcast
+    # and not modified afterwards: either the whole routeCost table (destIDs None) or the
+    # costs of the given destIDs
+    def RoutingInfoBroadcastPacket(sourceRouter, destRouter, advertisement):
+        size = Packet_META_Crafter.ROUTING_INFO_SIZE + len(advertisement[0]) * Packet_META_Crafter.ROUTING_ENTRY_SIZE
+        return CONTROL_PACKET_POOL.acquire(sourceRouter, destRouter, size, 1, advertisement, False, True)
+
+    # returns a crafted packet carrying a link state advertisement, shared by every packet
+    # flooding it
+    def LinkStatePacket(sourceRouter, destRouter, advertisement):
+        size = Packet_META_Crafter.ROUTING_INFO_SIZE + len(advertisement.costs) * Packet_META_Crafter.ROUTING_ENTRY_SIZE
+        return CONTROL_PACKET_POOL.acquire(sourceRouter, destRouter, size, 4, [advertisement], False, True)
+
+    # returns a crafted packet with meta information for a tracing packet
+    # should add every router's distance to it on transmission
+    def RoutingInfoTracePacket(sourceRouter, destRouter):
+        meta_table = [ [], 0 ]
+        return CONTROL_PACKET_POOL.acquire(sourceRouter, destRouter, Packet_META_Crafter.ROUTING_INFO_SIZE + len(meta_table), 2, meta_table, True, True)
+
+    # returns a crafted packet with meta information for a throttle packet
+    def RoutingInfoThrottlePacket(sourceRouter, destRouter, percentage):
+        meta_table = [percentage]
+        return CONTROL_PACKET_POOL.acquire(sourceRouter, destRouter, Packet_META_Crafter.ROUTING_INFO_SIZE + len(meta_table), 3, meta_table, False, True)
+
+class Packet_META:
+    # meta_types:
+    # comments give meta_type as an ID number, the information they are supposed to represent,
+    # and below them is the data that goes in the meta_table. 
+    #
+    # 0 --> routing information request/response for routing table
+    #       REQUEST:  [routerID]
+    #       RESPONSE: [routerID, cost]
+    # 1 --> routing information broadcast for routing table
+    #       REQUEST:  unused
+    #       RESPONSE: [costs, destIDs] whole routeCost table with destIDs None, or the costs of
+    #                 only the changed destIDs in delta mode. shared by all the packets of a
+    #                 broadcast, so it's read only (see Router.getAdvertisement)
+    # 2 --> routing trace packet
+    #       REQUEST:  unused
+    #       RESPONSE: [ [r1, r2, r3, ...], [totalCost] ] list of routers traversed, and a cumulative cost
+    # 3 --> throttle packet
+    #       REQUEST: unused
+    #       RESPONSE: [percentage] percent to set connection throughput to between these two routers
+    # 4 --> link state advertisement
+    #       REQUEST:  unused
+    #       RESPONSE: [advertisement] LinkStateAdvertisement of some router, read only like type 1
+    # meta_table always has the fixed layout listed for its type
+    __slots__ = ("meta_type", "meta_table", "requires_inspection")
+
+    def __init__(self, meta_type, meta_table, requires_inspection):
+        self.meta_type = meta_type
+        self.meta_table = meta_table
+        self.requires_inspection = requires_inspection # indicates that every router must evaluate this packet
+
+    def PrintRoutingTrace(packet):
+        trace_table = packet.meta_info.meta_table[0]
+        total_cost = str(packet.meta_info.meta_table[1])
+        trace = ""
+        sourceID = packet.getSourceID()
+        destID = packet.getDestinationID()
+        trace += "Routing Trace Packet from r" + str(sourceID) + " to r" + str(destID) + "\n";
+        trace += "Routing Trace Stack: "
+        # print out trace stack
+        for i in range(len(trace_table)):
+            trace += "r" + str(trace_table[i])
+            if(i != len(trace_table) - 1):
+                trace += " -> "
+        trace += ", cost: " + str(total_cost)
+        print(trace)
+
+
+
+# helper class to define the properties of a connection between two routers.
+# a throttled connection recovers a step at every throughput decay boundary its router
+# passes (see Router.checkConnectionThrottles). instead of being updated at each one, it
+# keeps the throttle it was set to and its router's decayCount at the time, and works
+# out the current throttle from the boundaries passed since when it's read
+class Connection:
+    __slots__ = ("owner", "other", "throughput", "failureRate", "cost", "throughputPercent",
+                 "throttleStart", "throttleMark", "throttleCount", "throttleValue")
+
+    def __init__(self, otherRouter, throughput, failureRate, owner = None):
+        self.owner = owner # router the connection belongs to
+        self.other = otherRouter
+        self.throughput = throughput
+        self.failureRate = failureRate
+        self.cost = 100 * 1/throughput
+        self.throughputPercent = 1
+        self.throttleStart = 1 # throttle percent when last set
+        self.throttleMark = 0 # owner's decayCount when last set
+        self.throttleCount = 0 # decayCount throttleValue was worked out for
+        self.throttleValue = 1
+
+    # throttle percent as of the owner's last decay boundary
+    @property
+    def throttlePercent(self):
+        return self.getThrottleAt(0 if self.owner == None else self.owner.decayCount)
+
+    @throttlePercent.setter
+    def throttlePercent(self, percent):
+        self.throttleStart = percent
+        self.throttleMark = 0 if self.owner == None else self.owner.decayCount
+        self.throttleCount = self.throttleMark
+        self.throttleValue = percent
+        if(self.owner != None):
+            self.owner.trackThrottle(self)
+
+    # throttle percent once the owner's decayCount is count: the throttle it was set to,
+    # recovered towards 1 by throughputDecay for every boundary since
+    def getThrottleAt(self, count):
+        if(count < self.throttleCount):
+            self.throttleCount = self.throttleMark
+            self.throttleValue = self.throttleStart
+        value = self.throttleValue
+        if(value != 1):
+            decay = self.getThroughputDecay()
+            for i in range(count - self.throttleCount):
+                value += (1 - value) * decay
+            self.throttleValue = value
+        self.throttleCount = count
+        return value
+
+    # owner's throughputDecay, the default one without an owner
+    def getThroughputDecay(self):
+        if(self.owner == None):
+            return DEFAULT_SIMULATION_CONFIG.throughputDecay
+        return self.owner.config.throughputDecay
+
+    # number of decay boundaries after the owner's last one until the throttle is back
+    # over 0.95, where it snaps to 1. -1 if it never gets there
+    def getRecoverySteps(self):
+        value = self.throttlePercent
+        decay = self.getThroughputDecay()
+        steps = 0
+        while(value < 0.95):
+            if(decay <= 0):
+                return -1
+            value += (1 - value) * decay
+            steps += 1
+        return steps
+
+    def updateThroughputPercent(self, percent):
+        self.throughputPercent = percent
+        self.cost = 100 * 1 / (self.throughput * self.throughputPercent * self.throttlePercent)
+
+    def updateThrottlePercent(self, percent):
+        self.throttlePercent = percent
+        self.cost = 100 * 1 / (self.throughput * self.throughputPercent * self.throttlePercent)
+
+    def getThroughput(self):
+        return self.throughput * self.throughputPercent * self.throttlePercent
+
+    # throughput once the owner's decayCount is count
+    def getThroughputAt(self, count):
+        return self.throughput * self.throughputPercent * self.getThrottleAt(count)
+
+    def getThroughputPercent(self):
+        return self.throughputPercent
+
+    def connectionSuccess(self):
+        success = random.random() > self.failureRate
+        return success
+
@@ -0,0 +1,125 @@
+import heapq
+
+# Discrete event driver for a list of routers (indexed by routerID). Gives the same
+# results as calling timeTick on every router every tick, but a router is only ticked
+# when it has work to do: picking up a queued packet, a packet finishing on a link,
+# a broadcast timer firing, a throttle decay being due, or a packet arriving.
+# The ticks in between are applied in bulk with Router.skipTicks the next time the
+# router is touched, so idle routers cost nothing.
+class EventScheduler:
+    def __init__(self, routers):
+        self.routers = routers
+        self.events = [] # heap of (time, routerID)
+        self.nextTick = [] # time of each router's pending event
+        self.lastTick = [] # last time each router is up to date with
+        self.running = False
+        self.time = 0
+        self.endTime = 0
+        self.currentID = -1
+
+        for i in range(len(routers)):
+            routers[i].scheduler = self
+
+    # runs the simulation for timeToRun steps starting at time, returns the end time.
+    # tickHook is called like in runRouters, as an event before the routers' events of
+    # the tick it asked for
+    def run(self, timeToRun, time, tickHook = None):
+        endTime = time + timeToRun
+        self.endTime = endTime
+        numRouters = len(self.routers)
+        self.events = []
+        self.nextTick = [endTime] * numRouters
+        self.lastTick = [time - 1] * numRouters
+
+        # routers may have been changed from outside since the last run
+        for i in range(numRouters):
+            self.schedule(self.routers[i], self.routers[i].nextActiveTime(time - 1))
+
+        hookTime = time if tickHook != None else endTime
+        self.running = True
+        while(True):
+            eventTime = self.events[0][0] if len(self.events) != 0 else endTime
+            if(hookTime <= eventTime and hookTime < self.endTime):
+                # nothing has ticked hookTime yet, so routers it sends packets to get it
+                self.time = hookTime
+                self.currentID = -1
+                hookTime = tickHook(hookTime)
+                if(hookTime == None):
+                    self.endTime = self.time
+                    break
+                continue
+            if(eventTime >= self.endTime):
+                break
+            eventTime, routerID = heapq.heappop(self.events)
+            if(self.nextTick[routerID] != eventTime): # superseded by an earlier wake
+                continue
+
+            router = self.routers[routerID]
+            self.time = eventTime
+            self.currentID = routerID
+            self.syncRouter(router, eventTime - 1)
+            self.lastTick[routerID] = eventTime
+            self.nextTick[routerID] = endTime
+            router.timeTick(eventTime)
+            self.schedule(router, router.nextActiveTime(eventTime))
+        self.running = False
+        self.currentID = -1
+
+        for i in range(numRouters):
+            self.syncRouter(self.routers[i], self.endTime - 1)
+        return self.endTime
+
+    # ends the current run once every router has had the tick being run
+    def stop(self):
+        if(self.running):
+            self.endTime = min(self.endTime, self.time + 1)
+
+    # queue an event for the router if it's sooner than the one it has
+    def schedule(self, router, time):
+        routerID = router.routerID
+        if(time < self.nextTick[routerID]):
+            self.nextTick[routerID] = time
+            heapq.heappush(self.events, (time, routerID))
+
+    # applies the router's skipped ticks up to and including the given time
+    def syncRouter(self, router, time):
+        routerID = router.routerID
+        skipped = time - self.lastTick[routerID]
+        if(skipped > 0):
+            router.skipTicks(skipped, time)
+            self.lastTick[routerID] = time
+
+    # called by a router before a packet arrives. the fixed step loop ticks routers in
+    # order, so a router after the one currently ticking still gets this tick, and a
+    # router before it has already had it and gets the next one
+    def wake(self, router):
+        if(not self.running):
+            return
+
+        if(router.routerID > self.currentID):
+            self.syncRouter(router, self.time - 1)
+            self.schedule(router, self.time)
+        else:
+            self.syncRouter(router, self.time)
+            self.schedule(router, self.time + 1)
+
+# Runs timeToRun steps of the routers starting at time, with the scheduler if given or
+# by ticking every router every step. returns the time it stopped at.
+# tickHook(time), if given, is called before any router ticks time, and returns the next
+# time it should be called at or None to stop before ticking time. the first call is at
+# the start time
+def runRouters(routers, timeToRun, time, scheduler = None, tickHook = None):
+    if(scheduler != None):
+        return scheduler.run(timeToRun, time, tickHook)
+
+    endTime = time + timeToRun
+    hookTime = time
+    while(time < endTime):
+        if(tickHook != None and time >= hookTime):
+            hookTime = tickHook(time)
+            if(hookTime == None):
+                return time
+        for router in routers:
+            router.timeTick(time)
+        time = time + 1
+    return time
@@ -0,0 +1,168 @@
+import pickle
+import random
+import struct
+import zlib
+from array import array
+from router import *
+
+# Simulation snapshots. a snapshot holds the complete state of every router (routing
+# table, connections with their throughput and throttle percentages, queued and in flight
+# packets, link state database, timers, counters and config) plus the time and the state
+# of the random module, so a run restored from it continues exactly like the original
+# would have. this lets many experiments start from one converged network instead of
+# each warming it up.
+#
+# take snapshots between runs: with an event scheduler every router is caught up once a
+# run returns, and packets waiting in a Router.outbox aren't part of the snapshot.
+# metrics, profilers, schedulers and detectors aren't either, attach new ones after restoring.
+#
+# file format:
+#   header   --> magic, version, numRouters, time (SNAPSHOT_HEADER)
+#   payload  --> zlib compressed pickle of the dict returned by takeSnapshot, with the
+#                routing tables stored as the raw bytes of their arrays
+
+SNAPSHOT_MAGIC = b"RSNP"
+SNAPSHOT_VERSION = 2 # 2 added link state routing
+SNAPSHOT_HEADER = struct.Struct("<4sIIq") # magic, version, numRouters, time
+SNAPSHOT_COMPRESSION_LEVEL = 1 # zlib level, routing tables compress well even at the fastest
+
+# state of one router
+def getRouterSnapshot(router, configs):
+    # routers usually share one config, store each distinct one once
+    config = vars(router.config)
+    if(config not in configs):
+        configs.append(config)
+
+    connections = []
+    for connection in router.connections:
+        connections.append((connection.other.routerID, connection.throughput, connection.failureRate,
+                            connection.cost, connection.throughputPercent, connection.throttlePercent))
+    queues = []
+    for queue in router.queuedPackets.queues:
+        queues.append([packet.toRecord() for packet in queue])
+
+    return {
+        "routerID": router.routerID,
+        "config": configs.index(config),
+        "routeCost": router.routeCost.tobytes(),
+        "routeNextHop": router.routeNextHop.tobytes(),
+        "connections": connections,
+        "queues": queues,
+        "queueMaxSizes": list(router.queuedPackets.maxSizes),
+        "queueDropPolicies": list(router.queuedPackets.dropPolicies),
+        "currentPacket": None if router.currentPacket == None else router.currentPacket.toRecord(),
+        "currentConnectionID": router.currentConnectionID,
+        "currentPacketProg": router.currentPacketProg,
+        "timeSinceBroadcast": router.timeSinceBroadcast,
+        "deltaBroadcast": router.deltaBroadcast,
+        "changedRoutes": sorted(router.changedRoutes),
+        "broadcastsSinceRefresh": router.broadcastsSinceRefresh,
+        "linkStateDatabase": None if router.linkStateDatabase == None else list(router.linkStateDatabase),
+        "spfParent": None if router.spfParent == None else router.spfParent.tobytes(),
+        "pendingFloods": list(router.pendingFloods),
+        "linkStateDirty": router.linkStateDirty,
+        "linkStateSequence": router.linkStateSequence,
+        "controlPacketsSent": router.controlPacketsSent,
+        "controlBytesSent": router.controlBytesSent,
+        "packetsForwarded": router.packetsForwarded,
+        "packetsDropped": router.packetsDropped,
+        "routeChanges": router.routeChanges,
+    }
+
+# state of the whole simulation at the given time. packet records and configs are
+# copied, so the snapshot doesn't change as the simulation goes on
+def takeSnapshot(routers, time):
+    return copySnapshot(collectSnapshot(routers, time))
+
+# takeSnapshot without the copy, still referring to the routers' live packet tables
+# and configs. only for pickling straight away
+def collectSnapshot(routers, time):
+    configs = []
+    routerStates = [getRouterSnapshot(router, configs) for router in routers]
+    return {"numRouters": len(routers), "time": time, "random": random.getstate(),
+            "configs": configs, "routers": routerStates}
+
+# deep copy of a snapshot, through pickle like a snapshot file
+def copySnapshot(snapshot):
+    return pickle.loads(pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL))
+
+# builds routers from a snapshot and restores the random module's state.
+# returns the routers and the snapshot's time. the snapshot is copied first, so it can
+# be restored any number of times
+def restoreSnapshot(snapshot):
+    return buildFromSnapshot(copySnapshot(snapshot))
+
+# restoreSnapshot for a snapshot nothing else uses, the routers take over its packet tables
+def buildFromSnapshot(snapshot):
+    numRouters = snapshot["numRouters"]
+    configs = [SimulationConfig(**settings) for settings in snapshot["configs"]]
+    routerStates = snapshot["routers"]
+    routers = []
+    for state in routerStates:
+        routers.append(Router(state["routerID"], numRouters, configs[state["config"]]))
+
+    for router, state in zip(routers, routerStates):
+        for otherID, throughput, failureRate, cost, throughputPercent, throttlePercent in state["connections"]:
+            router.createConnection(routers[otherID], throughput, failureRate)
+            connection = router.connections[-1]
+            connection.cost = cost
+            connection.throughputPercent = throughputPercent
+            connection.throttlePercent = throttlePercent
+
+        router.routeCost = array("d")
+        router.routeCost.frombytes(state["routeCost"])
+        router.routeNextHop = array("i")
+        router.routeNextHop.frombytes(state["routeNextHop"])
+        router.rebuildRoutingIndex()
+
+        queue = router.queuedPackets
+        for priority in range(len(state["queues"])):
+            for record in state["queues"][priority]:
+                packet = Packet.fromRecord(record, routers)
+                queue.queues[priority].append(packet)
+                queue.sizes[priority] += packet.size
+        queue.maxSizes = list(state["queueMaxSizes"])
+        queue.dropPolicies = list(state["queueDropPolicies"])
+
+        if(state["currentPacket"] != None):
+            router.currentPacket = Packet.fromRecord(state["currentPacket"], routers)
+        router.currentConnectionID = state["currentConnectionID"]
+        router.currentPacketProg = state["currentPacketProg"]
+        router.timeSinceBroadcast = state["timeSinceBroadcast"]
+        router.deltaBroadcast = state["deltaBroadcast"]
+        router.changedRoutes = set(state["changedRoutes"])
+        router.broadcastsSinceRefresh = state["broadcastsSinceRefresh"]
+        if(state["linkStateDatabase"] != None):
+            router.linkStateDatabase = list(state["linkStateDatabase"])
+            router.spfParent = array("i")
+            router.spfParent.frombytes(state["spfParent"])
+        router.pendingFloods = list(state["pendingFloods"])
+        router.linkStateDirty = state["linkStateDirty"]
+        router.linkStateSequence = state["linkStateSequence"]
+        router.controlPacketsSent = state["controlPacketsSent"]
+        router.controlBytesSent = state["controlBytesSent"]
+        router.packetsForwarded = state["packetsForwarded"]
+        router.packetsDropped = state["packetsDropped"]
+        router.routeChanges = state["routeChanges"]
+
+    random.setstate(snapshot["random"])
+    return routers, snapshot["time"]
+
+# writes a snapshot of the simulation at the given time to a file
+def saveSnapshot(path, routers, time):
+    payload = zlib.compress(pickle.dumps(collectSnapshot(routers, time), pickle.HIGHEST_PROTOCOL), SNAPSHOT_COMPRESSION_LEVEL)
+    with open(path, "wb") as out:
+        out.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(routers), time))
+        out.write(payload)
+
+# restores a simulation from a snapshot file, returns the routers and the snapshot's time
+def loadSnapshot(path):
+    with open(path, "rb") as file:
+        header = file.read(SNAPSHOT_HEADER.size)
+        payload = file.read()
+    if(len(header) != SNAPSHOT_HEADER.size):
+        raise ValueError("not a snapshot file: " + path)
+    magic, version, numRouters, time = SNAPSHOT_HEADER.unpack(header)
+    if(magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION):
+        raise ValueError("not a version " + str(SNAPSHOT_VERSION) + " snapshot file: " + path)
+    return buildFromSnapshot(pickle.loads(zlib.decompress(payload)))
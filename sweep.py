@@ -0,0 +1,174 @@
+import argparse
+import csv
+import itertools
+import multiprocessing
+import random
+from main import *
+
+# Parameter sweep over SimulationConfig settings. every combination of the given
+# setting values is run with every seed across a process pool, each run being the
+# main.py scenario (warm up, bandwidth test with traces, router failure), and the
+# summary of every run is collected into one table.
+#
+# python sweep.py --set broadcastFrequency=5,10,20 --set throughputDecay=0.1,0.2 --seeds 0,1,2
+#
+# the router info file sets every router's maxQueueSize, so it isn't read when
+# maxQueueSize is swept and the two can't be given together
+
+SWEEP_MAX_CONVERGENCE_TICKS = 1000
+SWEEP_DESYNC_TICKS = 50
+SWEEP_LOAD_PACKETS = 9 # per sending router in the bandwidth test
+SWEEP_PACKET_SIZE = 10
+SWEEP_COLUMNS = ["seed", "convergence_ticks", "failure_convergence_ticks", "packets_dropped",
+                 "packets_forwarded", "control_bytes", "traces", "mean_trace_cost", "trace_costs"]
+
+# parses a setting value from the command line using the type of its default
+def parseSetting(name, text):
+    default = getattr(DEFAULT_SIMULATION_CONFIG, name)
+    if(isinstance(default, bool)):
+        return text.lower() in ("1", "true", "yes")
+    if(isinstance(default, int)):
+        return int(text)
+    return float(text)
+
+# returns every combination of the values given for each setting, as dicts
+def expandGrid(grid):
+    names = sorted(grid)
+    combinations = []
+    for values in itertools.product(*[grid[name] for name in names]):
+        combinations.append(dict(zip(names, values)))
+    return combinations
+
+# sends a trace packet from source to destination
+def sendTrace(routers, sourceID, destinationID):
+    tracePacket = Packet_META_Crafter.RoutingInfoTracePacket(routers[sourceID], routers[destinationID])
+    routers[sourceID].queuePacket(tracePacket, routers[sourceID])
+
+# runs the main.py scenario under one configuration and seed, returns its summary row
+def runSweepScenario(task):
+    settings, seed, connectionPath, routerInfoPath = task
+    config = SimulationConfig(**settings)
+    rng = random.Random(seed)
+    quietTicks = 2 * math.ceil(config.broadcastFrequency) + 1
+
+    numRouters = countRoutersInFile(connectionPath)
+    routers = []
+    for i in range(numRouters):
+        routers.append(Router(i, numRouters, config))
+    createRouterConnectionsFromFile(routers, connectionPath)
+    if(routerInfoPath != None):
+        setupRouterVariablesFromFile(routers, routerInfoPath)
+    metrics = Metrics(numRouters)
+    metrics.attach(routers)
+    detector = ConvergenceDetector(routers)
+    last = numRouters - 1
+    farSide = min(4, last)
+
+    time = detector.runUntilConverged(SWEEP_MAX_CONVERGENCE_TICKS, quietTicks, 0)
+    convergenceTicks = detector.lastChange
+
+    # desynchronize router broadcasts
+    for i in range(SWEEP_DESYNC_TICKS):
+        for router in routers:
+            if(rng.random() > 0.5):
+                router.timeTick(time)
+        time = time + 1
+
+    # bandwidth test, traces under load and after it clears
+    sendTrace(routers, 0, last)
+    runSimulationForTime(routers, 50, time)
+    time = time + 50
+    for i in range(min(3, numRouters)):
+        for j in range(SWEEP_LOAD_PACKETS):
+            routers[i].queuePacket(Packet(routers[i], routers[last], SWEEP_PACKET_SIZE, None, None, False), routers[i])
+            routers[last - i].queuePacket(Packet(routers[last - i], routers[farSide], SWEEP_PACKET_SIZE, None, None, False), routers[last - i])
+    runSimulationForTime(routers, 50, time)
+    time = time + 50
+    sendTrace(routers, 0, last)
+    sendTrace(routers, min(2, last), last)
+    runSimulationForTime(routers, 1000, time)
+    time = time + 1000
+    sendTrace(routers, 0, last)
+    runSimulationForTime(routers, 100, time)
+    time = time + 100
+
+    # router failure
+    failureTime = time
+    routers[min(3, last)].forceRouterFailure()
+    time = detector.runUntilConverged(SWEEP_MAX_CONVERGENCE_TICKS, quietTicks, time)
+    lastChange = detector.lastChange
+    sendTrace(routers, 0, last)
+    runSimulationForTime(routers, 100, time)
+
+    traceCosts = [event[5] for event in metrics.getEvents(EVENT_TRACE)]
+    row = dict(settings)
+    row.update({
+        "seed": seed,
+        "convergence_ticks": convergenceTicks,
+        "failure_convergence_ticks": lastChange - failureTime,
+        "packets_dropped": sum(router.packetsDropped for router in routers),
+        "packets_forwarded": sum(router.packetsForwarded for router in routers),
+        "control_bytes": sum(router.controlBytesSent for router in routers),
+        "traces": len(traceCosts),
+        "mean_trace_cost": sum(traceCosts) / len(traceCosts) if len(traceCosts) != 0 else -1,
+        "trace_costs": ";".join(str(round(cost, 3)) for cost in traceCosts),
+    })
+    return row
+
+# runs every configuration in the grid with every seed on a pool of workers,
+# returns the summary rows in grid order. routerInfoPath is None to keep the
+# configured maxQueueSize
+def runSweep(grid, seeds, connectionPath = "connection_info.ri", routerInfoPath = "router_info.ri", numWorkers = None):
+    if(routerInfoPath != None and "maxQueueSize" in grid):
+        raise ValueError("the router info file overrides maxQueueSize, sweep it with routerInfoPath None")
+    tasks = []
+    for settings in expandGrid(grid):
+        for seed in seeds:
+            tasks.append((settings, seed, connectionPath, routerInfoPath))
+    with multiprocessing.Pool(numWorkers) as pool:
+        return pool.map(runSweepScenario, tasks)
+
+# prints rows as an aligned table
+def printTable(rows, columns):
+    widths = [len(column) for column in columns]
+    for row in rows:
+        for i in range(len(columns)):
+            widths[i] = max(widths[i], len(str(row[columns[i]])))
+    print("  ".join(columns[i].ljust(widths[i]) for i in range(len(columns))))
+    for row in rows:
+        print("  ".join(str(row[columns[i]]).ljust(widths[i]) for i in range(len(columns))))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="sweep simulation settings over seeds")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="SimulationConfig setting and the values to try, can be repeated")
+    parser.add_argument("--seeds", default="0")
+    parser.add_argument("--connections", default="connection_info.ri")
+    parser.add_argument("--router-info", default=None,
+                        help="per router queue sizes (default router_info.ri, not read when sweeping maxQueueSize)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    grid = {}
+    for setting in args.set:
+        name, values = setting.split("=", 1)
+        if(not hasattr(DEFAULT_SIMULATION_CONFIG, name)):
+            parser.error("unknown setting " + name + ", expected one of " + ", ".join(sorted(vars(DEFAULT_SIMULATION_CONFIG))))
+        grid[name] = [parseSetting(name, value) for value in values.split(",")]
+    seeds = [int(seed) for seed in args.seeds.split(",")]
+    routerInfoPath = args.router_info
+    if("maxQueueSize" in grid):
+        if(routerInfoPath != None):
+            parser.error("--router-info sets every router's maxQueueSize, it can't be used when sweeping maxQueueSize")
+    elif(routerInfoPath == None):
+        routerInfoPath = "router_info.ri"
+
+    rows = runSweep(grid, seeds, args.connections, routerInfoPath, args.workers)
+    columns = sorted(grid) + SWEEP_COLUMNS
+    with open(args.output, "w", newline="") as output:
+        writer = csv.DictWriter(output, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    printTable(rows, columns[:-1])
+    print("wrote " + str(len(rows)) + " runs to " + args.output)
@@ -0,0 +1,236 @@
+import math
+import mmap
+import struct
+import sys
+from array import array
+
+# Topology files.
+#
+# .ri text files hold comma separated entries with "|" separated fields:
+#   connection_info.ri --> routerA|routerB|bandwidth
+#   router_info.ri     --> maxQueueSize, one entry per router in id order
+# they are parsed as a stream so the whole file never has to be in memory.
+#
+# the binary format holds the same information and can be memory mapped:
+#   header             --> magic, version, numRouters, numEdges (TOPOLOGY_HEADER)
+#   edges              --> numEdges * [routerA, routerB, bandwidth] int32
+#   router attributes  --> numRouters * [maxQueueSize] int32, -1 if not given
+
+TOPOLOGY_MAGIC = b"RTOP"
+TOPOLOGY_VERSION = 1
+TOPOLOGY_HEADER = struct.Struct("<4sIIQI") # magic, version, numRouters, numEdges, reserved
+TOPOLOGY_EDGE_FIELDS = 3
+TOPOLOGY_ROUTER_FIELDS = 1
+TOPOLOGY_WRITE_CHUNK = 1 << 16 # ints buffered before each write when converting
+
+# yields the fields of each entry in a .ri file, reading it line by line
+def iterEntriesFromFile(path):
+    with open(path, "r") as file:
+        carry = ""
+        for line in file:
+            content = (carry + line.replace("\n", "")).split(",")
+            carry = content.pop() # may continue on the next line
+            for entry in content:
+                if(entry.strip() != ""):
+                    yield entry.split("|")
+        if(carry.strip() != ""):
+            yield carry.split("|")
+
+# yields (idA, idB, bandwidth) for each connection in a connection .ri file
+def iterEdgesFromFile(path):
+    for entry in iterEntriesFromFile(path):
+        yield int(entry[0]), int(entry[1]), int(entry[2])
+
+# yields the maxQueueSize of each router in a router .ri file
+def iterRouterInfoFromFile(path):
+    for entry in iterEntriesFromFile(path):
+        yield int(entry[0])
+
+# returns the number of routers referenced by a connection .ri file
+def countRoutersInFile(path):
+    numRouters = 0
+    for idA, idB, bandwidth in iterEdgesFromFile(path):
+        numRouters = max(numRouters, idA + 1, idB + 1)
+    return numRouters
+
+# converts .ri files into the binary format, streaming both files
+def convertTopology(connectionPath, routerInfoPath, outPath):
+    with open(outPath, "wb") as out:
+        out.write(bytes(TOPOLOGY_HEADER.size)) # filled in once the counts are known
+
+        numRouters = 0
+        numEdges = 0
+        buffer = array("i")
+        for idA, idB, bandwidth in iterEdgesFromFile(connectionPath):
+            buffer.extend((idA, idB, bandwidth))
+            numEdges += 1
+            numRouters = max(numRouters, idA + 1, idB + 1)
+            if(len(buffer) >= TOPOLOGY_WRITE_CHUNK):
+                buffer.tofile(out)
+                buffer = array("i")
+        buffer.tofile(out)
+
+        buffer = array("i")
+        if(routerInfoPath != None):
+            for maxQueueSize in iterRouterInfoFromFile(routerInfoPath):
+                buffer.append(maxQueueSize)
+        numRouters = max(numRouters, len(buffer))
+        buffer.extend([-1] * (numRouters - len(buffer)))
+        buffer.tofile(out)
+
+        out.seek(0)
+        out.write(TOPOLOGY_HEADER.pack(TOPOLOGY_MAGIC, TOPOLOGY_VERSION, numRouters, numEdges, 0))
+    return numRouters, numEdges
+
+# writes a binary topology from a list of (idA, idB, bandwidth) edges and optional
+# per router maxQueueSizes
+def writeTopology(outPath, numRouters, edges, maxQueueSizes = None):
+    with open(outPath, "wb") as out:
+        out.write(TOPOLOGY_HEADER.pack(TOPOLOGY_MAGIC, TOPOLOGY_VERSION, numRouters, len(edges), 0))
+        buffer = array("i")
+        for edge in edges:
+            buffer.extend(edge)
+        buffer.tofile(out)
+        if(maxQueueSizes == None):
+            maxQueueSizes = [-1] * numRouters
+        array("i", maxQueueSizes).tofile(out)
+
+# memory mapped binary topology. edges and routerInfo are int32 views straight into
+# the mapped file, nothing is copied until it's read
+class BinaryTopology:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.numRouters, self.numEdges, reserved = TOPOLOGY_HEADER.unpack_from(self.map, 0)
+        if(magic != TOPOLOGY_MAGIC or version != TOPOLOGY_VERSION):
+            self.close()
+            raise ValueError("not a version " + str(TOPOLOGY_VERSION) + " topology file: " + path)
+
+        self.view = memoryview(self.map)
+        edgesStart = TOPOLOGY_HEADER.size
+        edgesEnd = edgesStart + self.numEdges * TOPOLOGY_EDGE_FIELDS * 4
+        routersEnd = edgesEnd + self.numRouters * TOPOLOGY_ROUTER_FIELDS * 4
+        self.edges = self.view[edgesStart:edgesEnd].cast("i")
+        self.routerInfo = self.view[edgesEnd:routersEnd].cast("i")
+
+    # yields (idA, idB, bandwidth) for each edge
+    def iterEdges(self):
+        edges = self.edges
+        for i in range(0, len(edges), TOPOLOGY_EDGE_FIELDS):
+            yield edges[i], edges[i + 1], edges[i + 2]
+
+    # returns the router's maxQueueSize, or -1 if the topology doesn't set it
+    def getMaxQueueSize(self, routerID):
+        return self.routerInfo[routerID * TOPOLOGY_ROUTER_FIELDS]
+
+    def close(self):
+        if(hasattr(self, "view")):
+            self.edges.release()
+            self.routerInfo.release()
+            self.view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+# Topology generators. each returns (numRouters, edges) with edges as a list of
+# (idA, idB, bandwidth), one per mutual connection. bandwidths are drawn from
+# GENERATOR_BANDWIDTHS with the given random.Random so topologies are reproducible
+
+GENERATOR_BANDWIDTHS = [1, 1, 2, 3, 5]
+
+# routers connected in a cycle
+def generateRing(numRouters, rng):
+    edges = []
+    for i in range(numRouters):
+        if(numRouters > 2 or i < numRouters - 1):
+            edges.append((i, (i + 1) % numRouters, rng.choice(GENERATOR_BANDWIDTHS)))
+    return numRouters, edges
+
+# routers on a square-ish 2D grid, rows are filled up to numRouters
+def generateGrid(numRouters, rng):
+    width = max(1, int(math.ceil(math.sqrt(numRouters))))
+    edges = []
+    for i in range(numRouters):
+        if((i + 1) % width != 0 and i + 1 < numRouters):
+            edges.append((i, i + 1, rng.choice(GENERATOR_BANDWIDTHS)))
+        if(i + width < numRouters):
+            edges.append((i, i + width, rng.choice(GENERATOR_BANDWIDTHS)))
+    return numRouters, edges
+
+# Erdos-Renyi random graph with the given average degree (G(n, m) with m = n * degree / 2)
+def generateRandom(numRouters, rng, averageDegree = 4):
+    numEdges = min(numRouters * (numRouters - 1) // 2, int(numRouters * averageDegree / 2))
+    seen = set()
+    edges = []
+    while(len(edges) < numEdges):
+        idA = rng.randrange(numRouters)
+        idB = rng.randrange(numRouters)
+        if(idA == idB):
+            continue
+        key = (min(idA, idB), max(idA, idB))
+        if(key in seen):
+            continue
+        seen.add(key)
+        edges.append((key[0], key[1], rng.choice(GENERATOR_BANDWIDTHS)))
+    return numRouters, edges
+
+# Barabasi-Albert scale free graph, each new router attaches to linksPerRouter existing
+# routers with probability proportional to their degree
+def generateScaleFree(numRouters, rng, linksPerRouter = 2):
+    edges = []
+    endpoints = [] # every router appears once per connection it has
+    for i in range(1, min(numRouters, linksPerRouter + 1)):
+        edges.append((i - 1, i, rng.choice(GENERATOR_BANDWIDTHS)))
+        endpoints.extend((i - 1, i))
+    for i in range(linksPerRouter + 1, numRouters):
+        targets = set()
+        while(len(targets) < linksPerRouter):
+            targets.add(rng.choice(endpoints))
+        for target in sorted(targets):
+            edges.append((target, i, rng.choice(GENERATOR_BANDWIDTHS)))
+            endpoints.extend((target, i))
+    return numRouters, edges
+
+# k-ary fat tree of switches: (k/2)^2 core routers, and k pods of k/2 aggregation and
+# k/2 edge routers. k is the smallest even number giving at least numRouters routers
+# (5k^2/4), so the result may be larger than asked for
+def generateFatTree(numRouters, rng):
+    k = 2
+    while(5 * k * k // 4 < numRouters):
+        k += 2
+    half = k // 2
+    numCore = half * half
+    edges = []
+    for pod in range(k):
+        aggregation = numCore + pod * k
+        edge = aggregation + half
+        for a in range(half):
+            # each aggregation router connects to half of the core routers
+            for c in range(half):
+                edges.append((a * half + c, aggregation + a, rng.choice(GENERATOR_BANDWIDTHS)))
+            for e in range(half):
+                edges.append((aggregation + a, edge + e, rng.choice(GENERATOR_BANDWIDTHS)))
+    return numCore + k * k, edges
+
+TOPOLOGY_GENERATORS = {
+    "ring": generateRing,
+    "grid": generateGrid,
+    "random": generateRandom,
+    "scalefree": generateScaleFree,
+    "fattree": generateFatTree,
+}
+
+# python topology.py convert connection_info.ri router_info.ri out.rtop
+if __name__ == "__main__":
+    if(len(sys.argv) < 4 or sys.argv[1] != "convert"):
+        print("usage: python topology.py convert <connections.ri> [router_info.ri] <out.rtop>")
+        sys.exit(1)
+
+    routerInfoPath = sys.argv[3] if len(sys.argv) > 4 else None
+    numRouters, numEdges = convertTopology(sys.argv[2], routerInfoPath, sys.argv[-1])
+    print("wrote " + sys.argv[-1] + ": " + str(numRouters) + " routers, " + str(numEdges) + " connections")
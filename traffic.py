@@ -0,0 +1,263 @@
+import csv
+import heapq
+import math
+import random
+from router import *
+from scheduler import runRouters
+
+# Data traffic generation. a traffic pattern is a list of flows, each sending packets from
+# one router to another with an arrival process and a packet size distribution. packets
+# are made lazily: the generator only keeps the next arrival of each flow in a heap and
+# queues packets at their source router on the tick they arrive, so the number of packets
+# in memory is bounded by what's in the network, not by what's been sent.
+#
+# routers report deliveries and drops of flow packets through Router.traffic, which gives
+# each flow's throughput, latency (ticks from arrival at the source to delivery) and loss.
+#
+#   flows = flowsFromMatrix(matrix, ConstantSize(10))  # matrix[src][dst] = packets per tick
+#   traffic = TrafficGenerator(routers, flows, seed=1)
+#   time = traffic.run(1000, time)
+#   print(traffic.formatReport())
+
+TRAFFIC_REPORT_COLUMNS = ["flow", "source", "destination", "sent", "delivered", "dropped", "in_flight",
+                          "loss", "throughput", "mean_latency", "max_latency"]
+
+# Arrival processes. arrival times are fractional ticks and a packet is sent on the tick
+# its arrival falls in. processes with state (OnOffArrivals, BurstArrivals) belong to one flow
+
+# exponential gaps between arrivals, rate packets per tick on average
+class PoissonArrivals:
+    def __init__(self, rate):
+        self.rate = rate
+
+    def firstArrival(self, start, rng):
+        return start + rng.expovariate(self.rate)
+
+    def nextArrival(self, time, rng):
+        return time + rng.expovariate(self.rate)
+
+# one packet every interval ticks
+class ConstantArrivals:
+    def __init__(self, interval):
+        self.interval = interval
+
+    def firstArrival(self, start, rng):
+        return start
+
+    def nextArrival(self, time, rng):
+        return time + self.interval
+
+# Poisson arrivals at rate during on periods, nothing during off periods. period lengths
+# are exponential with the given means, starting with an on period
+class OnOffArrivals:
+    def __init__(self, rate, meanOn, meanOff):
+        self.rate = rate
+        self.meanOn = meanOn
+        self.meanOff = meanOff
+        self.onUntil = 0 # end of the current on period
+
+    def firstArrival(self, start, rng):
+        self.onUntil = start + rng.expovariate(1 / self.meanOn)
+        return self.nextArrival(start, rng)
+
+    def nextArrival(self, time, rng):
+        arrival = time + rng.expovariate(self.rate)
+        # arrivals are memoryless, so one that falls past the on period restarts after the off period
+        while(arrival >= self.onUntil):
+            offUntil = self.onUntil + rng.expovariate(1 / self.meanOff)
+            self.onUntil = offUntil + rng.expovariate(1 / self.meanOn)
+            arrival = offUntil + rng.expovariate(self.rate)
+        return arrival
+
+# count packets all on the start tick
+class BurstArrivals:
+    def __init__(self, count):
+        self.count = count
+        self.sent = 0
+
+    def firstArrival(self, start, rng):
+        self.sent = 1
+        return start if self.count > 0 else math.inf
+
+    def nextArrival(self, time, rng):
+        if(self.sent >= self.count):
+            return math.inf
+        self.sent += 1
+        return time
+
+# Packet size distributions
+
+class ConstantSize:
+    def __init__(self, size):
+        self.size = size
+
+    def sample(self, rng):
+        return self.size
+
+# uniform between low and high, inclusive
+class UniformSize:
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def sample(self, rng):
+        return rng.randint(self.low, self.high)
+
+# exponential with the given mean, at least 1
+class ExponentialSize:
+    def __init__(self, mean):
+        self.mean = mean
+
+    def sample(self, rng):
+        return max(1, round(rng.expovariate(1 / self.mean)))
+
+# packets from sourceID to destinationID arriving from start until stop (None for no end),
+# with the flow's delivery statistics
+class Flow:
+    __slots__ = ("flowID", "sourceID", "destinationID", "arrivals", "sizes", "start", "stop",
+                 "sent", "sentBytes", "delivered", "deliveredBytes", "dropped", "latencyTotal", "latencyMax")
+
+    def __init__(self, flowID, sourceID, destinationID, arrivals, sizes, start = 0, stop = None):
+        self.flowID = flowID
+        self.sourceID = sourceID
+        self.destinationID = destinationID
+        self.arrivals = arrivals
+        self.sizes = sizes
+        self.start = start
+        self.stop = math.inf if stop == None else stop
+        self.sent = 0
+        self.sentBytes = 0
+        self.delivered = 0
+        self.deliveredBytes = 0
+        self.dropped = 0
+        self.latencyTotal = 0
+        self.latencyMax = 0
+
+# Packet.information of flow packets
+class FlowTag:
+    __slots__ = ("flow", "sentTime")
+
+    def __init__(self, flow, sentTime):
+        self.flow = flow
+        self.sentTime = sentTime
+
+# one Poisson flow per nonzero entry of matrix[sourceID][destinationID], in packets per tick
+def flowsFromMatrix(matrix, sizes, start = 0, stop = None):
+    flows = []
+    for sourceID in range(len(matrix)):
+        for destinationID in range(len(matrix[sourceID])):
+            rate = matrix[sourceID][destinationID]
+            if(rate > 0 and sourceID != destinationID):
+                flows.append(Flow(len(flows), sourceID, destinationID, PoissonArrivals(rate), sizes, start, stop))
+    return flows
+
+class TrafficGenerator:
+    def __init__(self, routers, flows, seed = None, scheduler = None):
+        self.routers = routers
+        self.flows = flows
+        self.rng = random.Random(seed) # separate from the random module so runs are reproducible
+        self.scheduler = scheduler # event scheduler driving the routers, if any
+        self.time = 0 # last tick run, kept up to date by the routers
+        self.startTime = None # first tick run
+
+        self.arrivals = [] # heap of (arrival time, flowID), the next arrival of each flow
+        for flow in flows:
+            arrival = flow.arrivals.firstArrival(flow.start, self.rng)
+            if(arrival < flow.stop):
+                heapq.heappush(self.arrivals, (arrival, flow.flowID))
+
+        for router in routers:
+            router.traffic = self
+
+    # queues every packet arriving on the given tick at its source router. returns the
+    # tick of the next arrival, as a runRouters tick hook
+    def injectArrivals(self, time):
+        arrivals = self.arrivals
+        while(len(arrivals) != 0 and arrivals[0][0] < time + 1):
+            arrival, flowID = heapq.heappop(arrivals)
+            flow = self.flows[flowID]
+            size = flow.sizes.sample(self.rng)
+            source = self.routers[flow.sourceID]
+            packet = Packet(source, self.routers[flow.destinationID], size, FlowTag(flow, time), None, False)
+            flow.sent += 1
+            flow.sentBytes += size
+            source.queuePacket(packet, source)
+
+            arrival = flow.arrivals.nextArrival(arrival, self.rng)
+            if(arrival < flow.stop):
+                heapq.heappush(arrivals, (arrival, flowID))
+        if(len(arrivals) == 0):
+            return math.inf
+        return max(time + 1, math.floor(arrivals[0][0]))
+
+    # runs the simulation for timeToRun steps starting at time, sending each flow's
+    # packets as they arrive. with a scheduler the arrivals are events of its own, so
+    # only the routers they reach are woken. returns the end time
+    def run(self, timeToRun, time):
+        if(self.startTime == None):
+            self.startTime = time
+        return runRouters(self.routers, timeToRun, time, self.scheduler, self.injectArrivals)
+
+    # called by the destination router when a data packet arrives
+    def packetDelivered(self, packet):
+        tag = packet.information
+        if(not isinstance(tag, FlowTag)):
+            return
+        flow = tag.flow
+        latency = self.time - tag.sentTime
+        flow.delivered += 1
+        flow.deliveredBytes += packet.size
+        flow.latencyTotal += latency
+        flow.latencyMax = max(flow.latencyMax, latency)
+
+    # called by a router when it drops a packet
+    def packetDropped(self, packet):
+        tag = packet.information
+        if(isinstance(tag, FlowTag)):
+            tag.flow.dropped += 1
+
+    # statistics of each flow as dicts with TRAFFIC_REPORT_COLUMNS keys. throughput is in
+    # delivered bytes per tick from the flow's start up to the last tick run
+    def getFlowStats(self):
+        stats = []
+        for flow in self.flows:
+            start = flow.start if self.startTime == None else max(flow.start, self.startTime)
+            duration = self.time + 1 - start
+            stats.append({
+                "flow": flow.flowID,
+                "source": flow.sourceID,
+                "destination": flow.destinationID,
+                "sent": flow.sent,
+                "delivered": flow.delivered,
+                "dropped": flow.dropped,
+                "in_flight": flow.sent - flow.delivered - flow.dropped,
+                "loss": flow.dropped / flow.sent if flow.sent != 0 else 0,
+                "throughput": flow.deliveredBytes / duration if duration > 0 else 0,
+                "mean_latency": flow.latencyTotal / flow.delivered if flow.delivered != 0 else -1,
+                "max_latency": flow.latencyMax,
+            })
+        return stats
+
+    # per flow report as an aligned table
+    def formatReport(self):
+        rows = []
+        for stat in self.getFlowStats():
+            row = []
+            for column in TRAFFIC_REPORT_COLUMNS:
+                value = stat[column]
+                row.append(str(round(value, 3)) if isinstance(value, float) else str(value))
+            rows.append(row)
+        widths = [len(column) for column in TRAFFIC_REPORT_COLUMNS]
+        for row in rows:
+            widths = [max(widths[i], len(row[i])) for i in range(len(row))]
+        lines = ["  ".join(TRAFFIC_REPORT_COLUMNS[i].ljust(widths[i]) for i in range(len(widths)))]
+        for row in rows:
+            lines.append("  ".join(row[i].ljust(widths[i]) for i in range(len(widths))))
+        return "\n".join(lines)
+
+    # writes the per flow statistics as CSV
+    def exportCSV(self, path):
+        with open(path, "w", newline="") as output:
+            writer = csv.DictWriter(output, fieldnames=TRAFFIC_REPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.getFlowStats())